@@ -0,0 +1,13 @@
+from rest_framework.authentication import BaseAuthentication
+
+
+class BatchOperationAuthentication(BaseAuthentication):
+    """
+    Authenticates the operations of a batch as the user the batch request
+    was authenticated as, without decoding the token again. BatchView sets
+    ``batch_auth`` on the request of each operation, which carries no
+    Authorization header of its own.
+    """
+
+    def authenticate(self, request):
+        return getattr(request._request, 'batch_auth', None)
@@ -0,0 +1,27 @@
+from rest_framework import serializers
+
+BATCH_MAX_OPERATIONS = 50
+BATCH_PATH_PREFIX = '/api/v1/'
+
+
+class BatchOperationSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=['GET', 'POST', 'PUT', 'PATCH', 'DELETE'])
+    path = serializers.CharField()
+    body = serializers.JSONField(required=False)
+
+    def to_internal_value(self, data):
+        if isinstance(data, dict) and isinstance(data.get('method'), str):
+            data = {**data, 'method': data['method'].upper()}
+        return super().to_internal_value(data)
+
+    def validate_path(self, value):
+        if not value.startswith(BATCH_PATH_PREFIX):
+            raise serializers.ValidationError(f"Path must start with '{BATCH_PATH_PREFIX}'.")
+        return value
+
+
+class BatchSerializer(serializers.Serializer):
+    operations = serializers.ListField(
+        child=BatchOperationSerializer(), allow_empty=False, max_length=BATCH_MAX_OPERATIONS
+    )
+    atomic = serializers.BooleanField(default=False)
@@ -0,0 +1,80 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from finances.models import Category, Income, Tag, Wallet
+
+User = get_user_model()
+
+
+class BatchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='owner', email='owner@example.com', password='pass')
+        self.wallet = Wallet.objects.create(user=self.user, name='cash', balance=0)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def batch(self, operations, atomic=False):
+        response = self.client.post('/api/v1/batch/', {'operations': operations, 'atomic': atomic}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def overdraw(self):
+        return {
+            'method': 'POST', 'path': '/api/v1/expenses/',
+            'body': {'amount': 500, 'text': 'rent', 'date': '2025-01-10T10:00:00Z', 'wallet_id': self.wallet.pk},
+        }
+
+    def test_operations_run_as_batch_user(self):
+        data = self.batch([{'method': 'POST', 'path': '/api/v1/tags/', 'body': {'name': 'work'}}])
+
+        self.assertEqual(data['results'][0]['status'], 201)
+        self.assertEqual(Tag.objects.get().user, self.user)
+
+    def test_unauthenticated_batch_is_rejected(self):
+        response = APIClient().post(
+            '/api/v1/batch/', {'operations': [{'method': 'GET', 'path': '/api/v1/tags/'}]}, format='json',
+        )
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_failed_atomic_batch_rolls_back(self):
+        data = self.batch([{'method': 'POST', 'path': '/api/v1/tags/', 'body': {'name': 'work'}}, self.overdraw()], atomic=True)
+
+        self.assertFalse(data['committed'])
+        self.assertEqual([result['status'] for result in data['results']], [201, 400])
+        self.assertFalse(Tag.objects.exists())
+
+    def test_rolled_back_versions_are_not_reused(self):
+        today = timezone.now().isoformat()
+        data = self.batch([
+            {'method': 'POST', 'path': '/api/v1/incomes/', 'body': {'amount': 111, 'text': 'bonus', 'date': today}},
+            {'method': 'GET', 'path': '/api/v1/incomes/'},
+            {'method': 'GET', 'path': '/api/v1/dashboard/'},
+            self.overdraw(),
+        ], atomic=True)
+        self.assertFalse(data['committed'])
+        self.assertFalse(Income.objects.exists())
+
+        response = self.client.post('/api/v1/incomes/', {'amount': 5, 'text': 'gift', 'date': today}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+
+        # Not the dashboard cached inside the batch, under the same version.
+        self.assertEqual(self.client.get('/api/v1/dashboard/').data['month']['income_total'], 5)
+
+    def test_unhandled_error_fails_only_its_operation(self):
+        with mock.patch('finances.views.TagViewSet.list', side_effect=RuntimeError), self.assertLogs('api.views', 'ERROR'):
+            data = self.batch([
+                {'method': 'POST', 'path': '/api/v1/categories/', 'body': {'name': 'food'}},
+                {'method': 'GET', 'path': '/api/v1/tags/'},
+                {'method': 'GET', 'path': '/api/v1/wallets/'},
+            ])
+
+        self.assertEqual([result['status'] for result in data['results']], [201, 500, 200])
+        self.assertTrue(Category.objects.filter(name='food').exists())
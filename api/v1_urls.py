@@ -1,5 +1,6 @@
 from django.urls import path, include
 from users.views import ProfileView
+from .views import BatchView
 
 urlpatterns = [
     path("", include("finances.urls")),
@@ -11,4 +12,5 @@ urlpatterns = [
     path("", include("funds.urls")),
     path("subscriptions/", include("subscriptions.urls")),
     path("users/me/", ProfileView.as_view(), name="profile"),
+    path("batch/", BatchView.as_view(), name="batch"),
 ]
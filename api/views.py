@@ -0,0 +1,106 @@
+import io
+import json
+import logging
+
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import transaction
+from django.urls import Resolver404, resolve
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from finances.versioning import burn_versions, record_bumps
+
+from .serializers import BatchSerializer
+
+logger = logging.getLogger(__name__)
+
+
+class BatchView(APIView):
+    """
+    Runs several API operations in one round trip. Each operation is
+    dispatched to its normal view as the calling user, and its status and
+    body are returned in order. With ``atomic`` the operations share one
+    transaction: the first failure stops the batch and rolls back the rest.
+    Without it, an operation that raises is rolled back on its own and
+    reported as a 500 while the others still run.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        operations = serializer.validated_data['operations']
+
+        if not serializer.validated_data['atomic']:
+            results = [self.run_isolated(request, operation) for operation in operations]
+            return Response({'committed': True, 'results': results})
+
+        # A rollback also undoes the data version bumps, while reads inside
+        # the batch already cached payloads under them; burn those numbers.
+        results = []
+        with record_bumps() as bumps:
+            try:
+                with transaction.atomic():
+                    for operation in operations:
+                        results.append(self.run_operation(request, operation))
+                        if results[-1]['status'] >= 400:
+                            transaction.set_rollback(True)
+                            break
+            except Exception:
+                burn_versions(bumps)
+                raise
+        committed = results[-1]['status'] < 400
+        if not committed:
+            burn_versions(bumps)
+        return Response({'committed': committed, 'results': results})
+
+    def run_isolated(self, request, operation):
+        try:
+            with transaction.atomic():
+                return self.run_operation(request, operation)
+        except Exception:
+            logger.exception("Batch operation %s %s failed", operation['method'], operation['path'])
+            return {'status': status.HTTP_500_INTERNAL_SERVER_ERROR, 'body': {'detail': 'Internal server error.'}}
+
+    def run_operation(self, request, operation):
+        path, _, query = operation['path'].partition('?')
+        try:
+            match = resolve(path)
+        except Resolver404:
+            return {'status': status.HTTP_404_NOT_FOUND, 'body': {'detail': 'Not found.'}}
+        if getattr(match.func, 'view_class', None) is type(self):
+            return {'status': status.HTTP_400_BAD_REQUEST, 'body': {'detail': 'Batches cannot be nested.'}}
+
+        response = match.func(self.build_request(request, operation, path, query), *match.args, **match.kwargs)
+        if isinstance(response, Response):
+            body = response.data
+        elif response.streaming:
+            body = None
+        else:
+            body = response.content.decode('utf-8', errors='replace') or None
+        return {'status': response.status_code, 'body': body}
+
+    def build_request(self, request, operation, path, query):
+        body = b''
+        if 'body' in operation:
+            body = json.dumps(operation['body']).encode('utf-8')
+        environ = {
+            key: value for key, value in request.META.items()
+            # The batch's own conditional headers do not apply to its operations,
+            # and its credentials are passed on by BatchOperationAuthentication.
+            if not key.startswith('HTTP_IF_') and key != 'HTTP_AUTHORIZATION'
+        }
+        environ.update({
+            'REQUEST_METHOD': operation['method'],
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.input': io.BytesIO(body),
+        })
+        sub_request = WSGIRequest(environ)
+        # Read by BatchOperationAuthentication: the operation runs as the
+        # batch's user without decoding the token and loading the user again.
+        sub_request.batch_auth = (request.user, request.auth)
+        return sub_request
@@ -0,0 +1,68 @@
+from django.db.models import Exists, OuterRef
+from django.shortcuts import get_object_or_404
+
+from .models import Building, Unit
+
+MANAGER = 'manager'
+RESIDENT = 'resident'
+
+
+class BuildingAccess:
+    """
+    The building (and unit) addressed by a nested route, with the role of
+    the requesting user in that building: 'manager', 'resident' or None.
+    """
+
+    def __init__(self, building, unit, role, user):
+        self.building = building
+        self.unit = unit
+        self.role = role
+        self.user = user
+
+    @property
+    def is_manager(self):
+        return self.role == MANAGER
+
+    @property
+    def is_member(self):
+        return self.role is not None
+
+    @property
+    def is_unit_resident(self):
+        return self.unit is not None and self.unit.resident_id == self.user.pk
+
+
+def resolve_access(request, view):
+    """
+    Load the building, unit and user's role of a nested building route in
+    one query, cached on the request so the permissions, querysets and
+    serializers of the same request share it. Raises Http404 when the
+    building, or a unit of that building, does not exist.
+    """
+    access = getattr(request, 'building_access', None)
+    if access is not None:
+        return access
+
+    user = request.user
+    building_pk = view.kwargs.get('building_pk')
+    unit_pk = view.kwargs.get('unit_pk')
+    is_resident = Exists(Unit.objects.filter(building=OuterRef('building_id' if unit_pk else 'pk'), resident=user.pk))
+    if unit_pk is not None:
+        unit = get_object_or_404(
+            Unit.objects.select_related('building', 'resident').annotate(is_resident=is_resident),
+            pk=unit_pk, building_id=building_pk,
+        )
+        building, resident = unit.building, unit.is_resident
+    else:
+        unit = None
+        building = get_object_or_404(Building.objects.annotate(is_resident=is_resident), pk=building_pk)
+        resident = building.is_resident
+
+    if building.manager_id == user.pk:
+        role = MANAGER
+    elif resident:
+        role = RESIDENT
+    else:
+        role = None
+    request.building_access = access = BuildingAccess(building, unit, role, user)
+    return access
@@ -1,7 +1,8 @@
 from django.contrib import admin
-from .models import Building, Unit, BuildingExpense, MaintenanceFee
+from .models import Building, Unit, BuildingExpense, MaintenanceFee, BuildingLedger
 
 admin.site.register(Building)
 admin.site.register(Unit)
 admin.site.register(BuildingExpense)
 admin.site.register(MaintenanceFee)
+admin.site.register(BuildingLedger)
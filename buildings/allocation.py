@@ -0,0 +1,43 @@
+from fractions import Fraction
+
+from rest_framework.exceptions import ValidationError
+
+
+def unit_weights(units, method):
+    """
+    Return ``{unit_id: weight}`` for splitting an expense by ``method``
+    ('equal', 'area' or 'occupants').
+    """
+    if method == 'equal':
+        weights = {unit.id: Fraction(1) for unit in units}
+    elif method == 'area':
+        missing = [unit.unit_number for unit in units if unit.area is None]
+        if missing:
+            raise ValidationError({'method': f"Units without an area: {', '.join(missing)}"})
+        weights = {unit.id: Fraction(unit.area) for unit in units}
+    else:
+        weights = {unit.id: Fraction(unit.occupants) for unit in units}
+    if not sum(weights.values()):
+        raise ValidationError({'method': "The units have no weight to split by."})
+    return weights
+
+
+def split_amount(total, weights):
+    """
+    Split a whole number of Rials in proportion to ``weights`` so the shares
+    add up to exactly ``total``: every unit gets the floor of its exact
+    share and the Rials left over go to the largest remainders (ties by
+    unit id).
+    """
+    weight_sum = sum(weights.values())
+    shares = {}
+    remainders = []
+    for unit_id, weight in weights.items():
+        exact = total * weight / weight_sum
+        shares[unit_id] = exact.numerator // exact.denominator
+        remainders.append((exact - shares[unit_id], unit_id))
+    left = total - sum(shares.values())
+    remainders.sort(key=lambda item: (-item[0], item[1]))
+    for _, unit_id in remainders[:left]:
+        shares[unit_id] += 1
+    return shares
@@ -0,0 +1,85 @@
+from collections import defaultdict
+from decimal import Decimal
+
+import jdatetime
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Coalesce
+
+from .models import Building, BuildingExpense, BuildingLedger, MaintenanceFee
+
+
+def jalali_year_month(day):
+    jalali_date = jdatetime.date.fromgregorian(date=day)
+    return jalali_date.year, jalali_date.month
+
+
+def record(building_id, day, income=0, expenses=0):
+    """
+    Add (signed) ``income`` and ``expenses`` to the building's ledger month
+    containing ``day`` and to its lifetime totals.
+    """
+    if not income and not expenses:
+        return
+    year, month = jalali_year_month(day)
+    with transaction.atomic():
+        entry, _ = BuildingLedger.objects.get_or_create(building_id=building_id, year=year, month=month)
+        BuildingLedger.objects.filter(pk=entry.pk).update(
+            income=F('income') + income, expenses=F('expenses') + expenses
+        )
+        # A month whose only entries were moved or deleted drops out of statements.
+        BuildingLedger.objects.filter(pk=entry.pk, income=0, expenses=0).delete()
+        Building.objects.filter(pk=building_id).update(
+            total_income=F('total_income') + income, total_expenses=F('total_expenses') + expenses
+        )
+
+
+def rebuild(building_ids=None):
+    """
+    Recompute the ledger and lifetime totals of the given buildings (all
+    when None) from their paid fees and expenses. Returns the number of
+    ledger rows written.
+    """
+    buildings = Building.objects.all()
+    if building_ids is not None:
+        buildings = buildings.filter(pk__in=building_ids)
+    buildings = list(buildings.only('pk'))
+    ids = [building.pk for building in buildings]
+
+    months = defaultdict(lambda: [Decimal(0), Decimal(0)])
+    paid_fees = (
+        MaintenanceFee.objects.filter(unit__building_id__in=ids, is_paid=True)
+        .annotate(day=Coalesce('payment_date', 'due_date'))
+        .values('unit__building_id', 'day')
+        .annotate(total=Sum('amount'))
+        .values_list('unit__building_id', 'day', 'total')
+    )
+    for building_id, day, total in paid_fees:
+        months[(building_id, *jalali_year_month(day))][0] += total
+    expenses = (
+        BuildingExpense.objects.filter(building_id__in=ids)
+        .values('building_id', 'date')
+        .annotate(total=Sum('amount'))
+        .values_list('building_id', 'date', 'total')
+    )
+    for building_id, day, total in expenses:
+        months[(building_id, *jalali_year_month(day))][1] += total
+
+    totals = defaultdict(lambda: [Decimal(0), Decimal(0)])
+    for (building_id, _, _), (income, spent) in months.items():
+        totals[building_id][0] += income
+        totals[building_id][1] += spent
+
+    with transaction.atomic():
+        BuildingLedger.objects.filter(building_id__in=ids).delete()
+        BuildingLedger.objects.bulk_create(
+            [
+                BuildingLedger(building_id=building_id, year=year, month=month, income=income, expenses=spent)
+                for (building_id, year, month), (income, spent) in months.items()
+            ],
+            batch_size=1000,
+        )
+        for building in buildings:
+            building.total_income, building.total_expenses = totals[building.pk]
+        Building.objects.bulk_update(buildings, ['total_income', 'total_expenses'], batch_size=1000)
+    return len(months)
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from buildings.ledger import rebuild
+
+
+class Command(BaseCommand):
+    help = "Rebuild the monthly BuildingLedger and lifetime building totals from paid fees and expenses."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--building', type=int, help="Only rebuild the ledger of this building id.")
+
+    def handle(self, *args, **options):
+        building_id = options.get('building')
+        count = rebuild([building_id] if building_id else None)
+        self.stdout.write(f"{count} ledger row(s) written.")
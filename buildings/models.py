@@ -19,6 +19,21 @@ class Building(models.Model):
         related_name='managed_buildings',
         help_text="کاربری که مدیر این ساختمان است"
     )
+    # Lifetime totals kept in step with BuildingLedger by buildings.ledger.
+    total_income = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        editable=False,
+        help_text="مجموع شارژهای پرداخت‌شده از ابتدا"
+    )
+    total_expenses = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        editable=False,
+        help_text="مجموع هزینه‌های ثبت‌شده از ابتدا"
+    )
 
     def __str__(self):
         return self.name
@@ -46,6 +61,17 @@ class Unit(models.Model):
         related_name='resident_of',
         help_text="کاربری که ساکن این واحد است"
     )
+    area = models.DecimalField(
+        max_digits=8,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        help_text="متراژ واحد (متر مربع)، برای تقسیم هزینه بر اساس متراژ"
+    )
+    occupants = models.PositiveSmallIntegerField(
+        default=1,
+        help_text="تعداد ساکنین واحد، برای تقسیم هزینه بر اساس نفرات"
+    )
 
     class Meta:
         unique_together = ('building', 'unit_number')
@@ -108,6 +134,68 @@ class MaintenanceFee(models.Model):
         blank=True,
         help_text="تاریخی که شارژ پرداخت شده است"
     )
+    expense = models.ForeignKey(
+        BuildingExpense,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='allocated_fees',
+        help_text="هزینه ساختمانی که این مبلغ سهم واحد از آن است (برای شارژ دوره‌ای خالی است)"
+    )
+
+    class Meta:
+        constraints = [
+            # صدور دوباره شارژ یک دوره برای یک واحد را بی‌اثر می‌کند.
+            models.UniqueConstraint(
+                fields=['unit', 'due_date'],
+                condition=models.Q(expense__isnull=True),
+                name='unique_fee_per_unit_due_date',
+            ),
+            # هر هزینه فقط یک بار بین واحدها تقسیم می‌شود.
+            models.UniqueConstraint(
+                fields=['unit', 'expense'],
+                condition=models.Q(expense__isnull=False),
+                name='unique_fee_per_unit_expense',
+            ),
+        ]
+        indexes = [
+            # گزارش معوقات: شارژهای پرداخت‌نشده هر واحد به ترتیب سررسید.
+            models.Index(fields=['unit', 'is_paid', 'due_date'], name='fee_unit_paid_due_idx'),
+        ]
 
     def __str__(self):
         return f"شارژ واحد {self.unit.unit_number} برای تاریخ {self.due_date}"
+
+
+class BuildingLedger(models.Model):
+    """
+    Income (paid fees) and expenses of a building in one Jalali month,
+    maintained by buildings.ledger as fees are paid and expenses recorded.
+    """
+    building = models.ForeignKey(
+        Building,
+        on_delete=models.CASCADE,
+        related_name='ledger_entries',
+        help_text="ساختمانی که این ردیف دفتر به آن تعلق دارد"
+    )
+    year = models.PositiveSmallIntegerField(help_text="سال شمسی")
+    month = models.PositiveSmallIntegerField(help_text="ماه شمسی")
+    income = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        help_text="مجموع شارژهای پرداخت‌شده در این ماه"
+    )
+    expenses = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        help_text="مجموع هزینه‌های ساختمان در این ماه"
+    )
+
+    class Meta:
+        unique_together = ('building', 'year', 'month')
+        ordering = ['year', 'month']
+
+    def __str__(self):
+        return f"{self.building.name} - {self.year}/{self.month}"
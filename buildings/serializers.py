@@ -1,3 +1,5 @@
+from decimal import Decimal
+
 from rest_framework import serializers
 from .models import Building, Unit, BuildingExpense, MaintenanceFee
 from users.serializers import SimpleUserSerializer
@@ -15,7 +17,7 @@ class UnitSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Unit
-        fields = ['id', 'unit_number', 'resident', 'resident_id']
+        fields = ['id', 'unit_number', 'resident', 'resident_id', 'area', 'occupants']
 
 
 class BuildingSerializer(serializers.ModelSerializer):
@@ -41,6 +43,38 @@ class BuildingExpenseSerializer(serializers.ModelSerializer):
         fields = ['id', 'description', 'amount', 'date']
 
 
+class IssueFeesSerializer(serializers.Serializer):
+    """
+    Input for issuing one period's fees to every unit of a building.
+    `overrides` maps unit ids to an amount that replaces the flat `amount`.
+    """
+    due_date = serializers.DateField()
+    amount = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=Decimal('0'), required=False)
+    overrides = serializers.DictField(
+        child=serializers.DecimalField(max_digits=12, decimal_places=2, min_value=Decimal('0')), required=False
+    )
+
+    def validate_overrides(self, value):
+        try:
+            return {int(unit_id): amount for unit_id, amount in value.items()}
+        except ValueError:
+            raise serializers.ValidationError("Keys must be unit ids.")
+
+    def validate(self, data):
+        if 'amount' not in data and not data.get('overrides'):
+            raise serializers.ValidationError("Provide an amount, overrides, or both.")
+        return data
+
+
+class AllocateExpensesSerializer(serializers.Serializer):
+    """
+    Input for splitting building expenses into per-unit charges.
+    """
+    expenses = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+    method = serializers.ChoiceField(choices=['equal', 'area', 'occupants'])
+    due_date = serializers.DateField()
+
+
 class MaintenanceFeeSerializer(serializers.ModelSerializer):
     """
     Serializer for maintenance fees (sharj).
@@ -49,5 +83,5 @@ class MaintenanceFeeSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = MaintenanceFee
-        fields = ['id', 'unit', 'amount', 'due_date', 'is_paid', 'payment_date']
-        read_only_fields = ['is_paid', 'payment_date']
+        fields = ['id', 'unit', 'amount', 'due_date', 'is_paid', 'payment_date', 'expense']
+        read_only_fields = ['is_paid', 'payment_date', 'expense']
@@ -1,3 +1,166 @@
-from django.test import TestCase
+from datetime import date
+from fractions import Fraction
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from . import ledger
+from .allocation import split_amount
+from .models import Building, BuildingExpense, BuildingLedger, MaintenanceFee, Unit
+
+User = get_user_model()
+
+
+class SplitAmountTests(SimpleTestCase):
+    def assert_exact_split(self, total, weights):
+        shares = split_amount(total, weights)
+        self.assertEqual(sum(shares.values()), total)
+        weight_sum = sum(weights.values())
+        for unit_id, weight in weights.items():
+            # Every share is its exact value rounded down or up.
+            self.assertLess(abs(shares[unit_id] - total * weight / weight_sum), 1)
+
+    def test_shares_add_up_to_total(self):
+        cases = [
+            {1: Fraction(1), 2: Fraction(1), 3: Fraction(1)},
+            {1: Fraction('75.5'), 2: Fraction('120.25'), 3: Fraction(90), 4: Fraction('64.1')},
+            {1: Fraction(1), 2: Fraction(0), 3: Fraction(4)},
+            {unit_id: Fraction(unit_id) for unit_id in range(1, 30)},
+        ]
+        for weights in cases:
+            for total in (0, 1, 2, 100, 101, 999_999, 12_345_677):
+                with self.subTest(weights=weights, total=total):
+                    self.assert_exact_split(total, weights)
+
+    def test_leftover_goes_to_largest_remainders(self):
+        self.assertEqual(split_amount(100, {1: Fraction(1), 2: Fraction(1), 3: Fraction(1)}), {1: 34, 2: 33, 3: 33})
+        self.assertEqual(split_amount(10, {1: Fraction(1), 2: Fraction(2)}), {1: 3, 2: 7})
+
+
+class AllocateExpensesTests(TestCase):
+    def setUp(self):
+        self.manager = User.objects.create_user(username='manager', email='manager@example.com', password='pass')
+        self.building = Building.objects.create(name='Sample', address='Address', manager=self.manager)
+        self.units = [Unit.objects.create(building=self.building, unit_number=str(number)) for number in (1, 2, 3)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+
+    def allocate(self, expense):
+        return self.client.post(
+            f'/api/v1/buildings/{self.building.pk}/allocate-expenses/',
+            {'expenses': [expense.pk], 'method': 'equal', 'due_date': '2025-02-01'}, format='json',
+        )
+
+    def test_shares_add_up_to_expense(self):
+        expense = BuildingExpense.objects.create(building=self.building, description='Roof', amount=100, date='2025-01-10')
+
+        self.assertEqual(self.allocate(expense).status_code, 201)
+        self.assertEqual(sorted(expense.allocated_fees.values_list('amount', flat=True)), [33, 33, 34])
+
+    def test_fractional_amount_is_rejected(self):
+        expense = BuildingExpense.objects.create(building=self.building, description='Roof', amount='100.50', date='2025-01-10')
+
+        self.assertEqual(self.allocate(expense).status_code, 400)
+        self.assertFalse(MaintenanceFee.objects.exists())
+
+    def test_allocated_shares_do_not_block_period_fees(self):
+        expense = BuildingExpense.objects.create(building=self.building, description='Roof', amount=90, date='2025-01-10')
+        self.allocate(expense)
+
+        response = self.client.post(
+            f'/api/v1/buildings/{self.building.pk}/issue-fees/', {'due_date': '2025-02-01', 'amount': 500}, format='json',
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['issued'], response.data['skipped_units']), (3, []))
+
+
+class LedgerTests(TestCase):
+    def setUp(self):
+        self.manager = User.objects.create_user(username='manager', email='manager@example.com', password='pass')
+        self.resident = User.objects.create_user(username='resident', email='resident@example.com', password='pass')
+        self.building = Building.objects.create(name='Sample', address='Address', manager=self.manager)
+        self.unit = Unit.objects.create(building=self.building, unit_number='1', resident=self.resident)
+        self.client = APIClient()
+
+    def snapshot(self):
+        self.building.refresh_from_db()
+        rows = set(BuildingLedger.objects.filter(building=self.building).values_list('year', 'month', 'income', 'expenses'))
+        return rows, self.building.total_income, self.building.total_expenses
+
+    def test_recorded_ledger_matches_rebuild(self):
+        self.client.force_authenticate(self.manager)
+        expenses_url = f'/api/v1/buildings/{self.building.pk}/expenses/'
+        ids = []
+        for amount, day in (('250000', '2025-01-10'), ('120000.50', '2025-02-25'), ('80000', '2025-03-21')):
+            response = self.client.post(expenses_url, {'description': 'Repair', 'amount': amount, 'date': day})
+            self.assertEqual(response.status_code, 201, response.data)
+            ids.append(response.data['id'])
+        # Move one expense to another month and delete the only one of a month.
+        self.client.patch(f'{expenses_url}{ids[0]}/', {'amount': '260000', 'date': '2025-02-01'})
+        self.client.delete(f'{expenses_url}{ids[2]}/')
+
+        self.client.force_authenticate(self.resident)
+        for amount, due_date in (('50000', date(2025, 1, 21)), ('65000', date(2025, 2, 20))):
+            fee = MaintenanceFee.objects.create(unit=self.unit, amount=amount, due_date=due_date)
+            response = self.client.post(
+                f'/api/v1/buildings/{self.building.pk}/units/{self.unit.pk}/fees/{fee.pk}/pay/'
+            )
+            self.assertEqual(response.status_code, 200, response.data)
+
+        recorded = self.snapshot()
+        ledger.rebuild([self.building.pk])
+        self.assertEqual(self.snapshot(), recorded)
+        # Two expense months and the month the fees were paid in; the months
+        # emptied by the move and the delete are gone.
+        self.assertEqual(len(recorded[0]), 3)
+
+    def test_rebuild_drops_stale_rows(self):
+        ledger.record(self.building.pk, date(2025, 1, 10), expenses=500)
+
+        ledger.rebuild([self.building.pk])
+
+        rows, income, expenses = self.snapshot()
+        self.assertEqual((rows, income, expenses), (set(), 0, 0))
+
+
+class BuildingVersionTests(TestCase):
+    def setUp(self):
+        self.manager = User.objects.create_user(username='manager', email='manager@example.com', password='pass')
+        self.resident = User.objects.create_user(username='resident', email='resident@example.com', password='pass')
+        self.outsider = User.objects.create_user(username='outsider', email='outsider@example.com', password='pass')
+        self.building = Building.objects.create(name='Sample', address='Address', manager=self.manager)
+        self.unit = Unit.objects.create(building=self.building, unit_number='1', resident=self.resident)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def test_write_invalidates_members_only(self):
+        resident, outsider = self.client_for(self.resident), self.client_for(self.outsider)
+        resident_etag = resident.get('/api/v1/buildings/')['ETag']
+        outsider_etag = outsider.get('/api/v1/buildings/')['ETag']
+
+        response = self.client_for(self.manager).post(
+            f'/api/v1/buildings/{self.building.pk}/units/', {'unit_number': '2'}, format='json',
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(resident.get('/api/v1/buildings/', HTTP_IF_NONE_MATCH=resident_etag).status_code, 200)
+        self.assertEqual(outsider.get('/api/v1/buildings/', HTTP_IF_NONE_MATCH=outsider_etag).status_code, 304)
+
+    def test_removed_resident_is_invalidated(self):
+        resident = self.client_for(self.resident)
+        etag = resident.get('/api/v1/buildings/')['ETag']
+
+        response = self.client_for(self.manager).patch(
+            f'/api/v1/buildings/{self.building.pk}/units/{self.unit.pk}/', {'resident_id': None}, format='json',
+        )
+
+        self.assertEqual(response.status_code, 200, response.data)
+        self.unit.refresh_from_db()
+        self.assertIsNone(self.unit.resident_id)
+
+        self.assertEqual(resident.get('/api/v1/buildings/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
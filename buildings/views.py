@@ -1,20 +1,40 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from django.db.models import Q, Sum
-from .models import Building, Unit, BuildingExpense, MaintenanceFee
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Min, Q, Sum
+from django.db.models.functions import Coalesce
+from .models import Building, Unit, BuildingExpense, MaintenanceFee, BuildingLedger
 from .serializers import (
     BuildingSerializer,
     UnitSerializer,
     BuildingExpenseSerializer,
-    MaintenanceFeeSerializer
+    MaintenanceFeeSerializer,
+    IssueFeesSerializer,
+    AllocateExpensesSerializer,
 )
+from .allocation import unit_weights, split_amount
+from . import ledger
+from .access import resolve_access
 from subscriptions.permissions import HasFeaturePermission
-from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from datetime import timedelta
+from finances.versioning import DataVersionMixin
 
 
-class BuildingViewSet(viewsets.ModelViewSet):
+class BuildingVersionMixin(DataVersionMixin):
+    """
+    ساختمان‌ها بین مدیر و ساکنین مشترک هستند، بنابراین هر تغییر شمارنده نسخه
+    مدیر و همه ساکنین همان ساختمان را افزایش می‌دهد.
+    """
+    version_resource = 'buildings'
+    audience_model = Building
+    audience_kwarg = 'building_pk'
+    audience_fields = ('manager', 'units__resident')
+
+
+class BuildingViewSet(BuildingVersionMixin, viewsets.ModelViewSet):
     """
     یک ViewSet برای مدیریت ساختمان‌ها.
 
@@ -22,6 +42,7 @@ class BuildingViewSet(viewsets.ModelViewSet):
     - **create**: یک ساختمان جدید ایجاد می‌کند و شما را به عنوان مدیر آن قرار می‌دهد.
     - **retrieve/update/destroy**: جزئیات یک ساختمان را مدیریت می‌کند (فقط برای مدیر).
     """
+    audience_kwarg = 'pk'
     serializer_class = BuildingSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -49,37 +70,208 @@ class BuildingViewSet(viewsets.ModelViewSet):
             self.permission_classes = [permissions.IsAuthenticated, HasFeaturePermission.for_feature('can_manage_buildings')]
         elif self.action in ['update', 'partial_update', 'destroy']:
             self.permission_classes = [IsManagerPermission]
+        elif self.action in ['issue_fees', 'allocate_expenses', 'arrears']:
+            self.permission_classes = [permissions.IsAuthenticated, IsManagerPermission]
         return super().get_permissions()
 
+    @action(detail=True, methods=['post'], url_path='issue-fees')
+    def issue_fees(self, request, pk=None):
+        """
+        صدور شارژ یک دوره برای تمام واحدهای ساختمان با یک درخواست.
+
+        مبلغ ثابت `amount` برای همه واحدها و `overrides` (شناسه واحد ← مبلغ) برای
+        واحدهایی با مبلغ متفاوت استفاده می‌شود. واحدهایی که برای این `due_date`
+        قبلاً شارژ دارند نادیده گرفته می‌شوند، بنابراین تکرار درخواست بی‌خطر است.
+        """
+        building = self.get_object()
+        serializer = IssueFeesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        due_date = serializer.validated_data['due_date']
+        flat_amount = serializer.validated_data.get('amount')
+        overrides = serializer.validated_data.get('overrides', {})
+
+        unit_ids = set(building.units.values_list('id', flat=True))
+        unknown = set(overrides) - unit_ids
+        if unknown:
+            raise ValidationError({'overrides': f"Units not in this building: {sorted(unknown)}"})
+
+        already_issued = set(
+            MaintenanceFee.objects.filter(unit_id__in=unit_ids, due_date=due_date, expense__isnull=True)
+            .values_list('unit_id', flat=True)
+        )
+        fees = []
+        for unit_id in sorted(unit_ids - already_issued):
+            amount = overrides.get(unit_id, flat_amount)
+            if amount is not None:
+                fees.append(MaintenanceFee(unit_id=unit_id, amount=amount, due_date=due_date))
+        # The unique (unit, due_date) constraint also covers a concurrent request.
+        MaintenanceFee.objects.bulk_create(fees, ignore_conflicts=True)
+
+        return Response({
+            'due_date': due_date,
+            'issued': len(fees),
+            'skipped_units': sorted(already_issued),
+        }, status=status.HTTP_201_CREATED)
+
     @action(detail=True, methods=['get'])
     def summary(self, request, pk=None):
         """
         ارائه خلاصه وضعیت مالی ساختمان.
 
-        این ویو مجموع هزینه‌های ثبت شده و مجموع شارژهای پرداخت شده را محاسبه کرده و موجودی نهایی را نمایش می‌دهد.
+        مجموع هزینه‌های ثبت شده و مجموع شارژهای پرداخت شده از مجموع‌های نگهداری‌شده روی
+        خود ساختمان خوانده می‌شود و موجودی نهایی را نمایش می‌دهد.
         این گزارش برای مدیر و تمام ساکنین ساختمان قابل مشاهده است.
         """
         building = self.get_object() # The get_queryset already ensures user has access
 
-        # Calculate total expenses
-        total_expenses = building.expenses.aggregate(total=Sum('amount'))['total'] or 0
+        return Response({
+            'total_income': building.total_income,
+            'total_expenses': building.total_expenses,
+            'balance': building.total_income - building.total_expenses
+        })
+
+    @action(detail=True, methods=['get'])
+    def statement(self, request, pk=None):
+        """
+        صورت‌حساب ساختمان از دفتر ماهانه: درآمد (شارژهای پرداخت‌شده)، هزینه‌ها،
+        خالص و مانده پایان هر دوره.
+
+        - `?group=month` (پیش‌فرض) ماه به ماه، با `?year=1403` فقط ماه‌های یک سال
+        - `?group=year` سال به سال
+        """
+        building = self.get_object()
+        group = request.query_params.get('group', 'month')
+        if group not in ('month', 'year'):
+            raise ValidationError({'group': "Must be 'month' or 'year'."})
+        year = request.query_params.get('year')
+        if year is not None and not year.isdigit():
+            raise ValidationError({'year': 'Must be a Jalali year, e.g. 1403.'})
+
+        entries = BuildingLedger.objects.filter(building=building)
+        opening = 0
+        if group == 'month' and year is not None:
+            before = entries.filter(year__lt=year).aggregate(income=Sum('income'), expenses=Sum('expenses'))
+            opening = (before['income'] or 0) - (before['expenses'] or 0)
+            entries = entries.filter(year=year)
+
+        if group == 'year':
+            rows = entries.values('year').annotate(income=Sum('income'), expenses=Sum('expenses')).order_by('year')
+        else:
+            rows = entries.order_by('year', 'month').values('year', 'month', 'income', 'expenses')
+
+        balance = opening
+        periods = []
+        for row in rows:
+            net = row['income'] - row['expenses']
+            balance += net
+            periods.append({**row, 'net': net, 'closing_balance': balance})
+
+        return Response({'group': group, 'opening_balance': opening, 'periods': periods})
+
+
+    @action(detail=True, methods=['post'], url_path='allocate-expenses')
+    def allocate_expenses(self, request, pk=None):
+        """
+        تقسیم یک یا چند هزینه ساختمان بین تمام واحدها به صورت مساوی، بر اساس متراژ
+        یا تعداد ساکنین و ثبت سهم هر واحد به عنوان شارژ.
+
+        مبالغ به ریال گرد می‌شوند و جمع سهم‌ها دقیقاً برابر مبلغ هزینه است؛
+        هزینه‌هایی که مبلغ اعشاری دارند پذیرفته نمی‌شوند.
+        هزینه‌هایی که قبلاً تقسیم شده‌اند نادیده گرفته می‌شوند.
+        """
+        building = self.get_object()
+        serializer = AllocateExpensesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        expenses = list(building.expenses.filter(pk__in=data['expenses']).order_by('pk'))
+        unknown = set(data['expenses']) - {expense.pk for expense in expenses}
+        if unknown:
+            raise ValidationError({'expenses': f"Expenses not in this building: {sorted(unknown)}"})
+        # Shares are whole Rials; a fractional total could not be split exactly.
+        fractional = [expense.pk for expense in expenses if expense.amount != expense.amount.to_integral_value()]
+        if fractional:
+            raise ValidationError({'expenses': f"Expenses with a fractional amount cannot be split: {fractional}"})
+        units = list(building.units.order_by('pk'))
+        if not units:
+            raise ValidationError({'expenses': "This building has no units."})
+        weights = unit_weights(units, data['method'])
+
+        already_allocated = set(
+            MaintenanceFee.objects.filter(expense__in=expenses).values_list('expense_id', flat=True)
+        )
+        fees = []
+        for expense in expenses:
+            if expense.pk in already_allocated:
+                continue
+            shares = split_amount(int(expense.amount), weights)
+            fees.extend(
+                MaintenanceFee(unit_id=unit_id, expense=expense, amount=share, due_date=data['due_date'])
+                for unit_id, share in shares.items() if share
+            )
+        MaintenanceFee.objects.bulk_create(fees, ignore_conflicts=True)
 
-        # Calculate total paid fees
-        total_income = MaintenanceFee.objects.filter(
-            unit__building=building,
-            is_paid=True
-        ).aggregate(total=Sum('amount'))['total'] or 0
+        return Response({
+            'allocated': [expense.pk for expense in expenses if expense.pk not in already_allocated],
+            'skipped': sorted(already_allocated),
+            'fees': len(fees),
+        }, status=status.HTTP_201_CREATED)
 
-        balance = total_income - total_expenses
 
+    @action(detail=True, methods=['get'])
+    def arrears(self, request, pk=None):
+        """
+        گزارش معوقات: مجموع شارژهای پرداخت‌نشده هر واحد به تفکیک مدت تأخیر
+        (۰ تا ۳۰، ۳۱ تا ۶۰، ۶۱ تا ۹۰ و بیش از ۹۰ روز پس از سررسید).
+        فقط واحدهای بدهکار برگردانده می‌شوند (فقط برای مدیر).
+        """
+        building = self.get_object()
+        today = timezone.localdate()
+
+        def overdue(min_days, max_days=None):
+            bucket = Q(due_date__lte=today - timedelta(days=min_days))
+            if max_days is not None:
+                bucket &= Q(due_date__gte=today - timedelta(days=max_days))
+            return Sum('amount', filter=bucket, default=0)
+
+        # One grouped query; the (unit, is_paid, due_date) index covers the filter.
+        rows = (
+            MaintenanceFee.objects.filter(unit__building=building, is_paid=False, due_date__lte=today)
+            .values('unit_id', 'unit__unit_number', 'unit__resident_id')
+            .annotate(
+                days_0_30=overdue(0, 30),
+                days_31_60=overdue(31, 60),
+                days_61_90=overdue(61, 90),
+                days_90_plus=overdue(91),
+                total=Sum('amount'),
+                fees=Count('id'),
+                oldest_due_date=Min('due_date'),
+            )
+            .order_by('-total', 'unit__unit_number')
+        )
+        units = [
+            {
+                'unit': row['unit_id'],
+                'unit_number': row['unit__unit_number'],
+                'resident': row['unit__resident_id'],
+                'days_0_30': row['days_0_30'],
+                'days_31_60': row['days_31_60'],
+                'days_61_90': row['days_61_90'],
+                'days_90_plus': row['days_90_plus'],
+                'total': row['total'],
+                'fees': row['fees'],
+                'oldest_due_date': row['oldest_due_date'],
+            }
+            for row in rows
+        ]
         return Response({
-            'total_income': total_income,
-            'total_expenses': total_expenses,
-            'balance': balance
+            'as_of': today,
+            'total': sum(row['total'] for row in units),
+            'units': units,
         })
 
 
-class UnitViewSet(viewsets.ModelViewSet):
+class UnitViewSet(BuildingVersionMixin, viewsets.ModelViewSet):
     """
     یک ViewSet برای مدیریت واحدها در یک ساختمان خاص.
 
@@ -94,26 +286,42 @@ class UnitViewSet(viewsets.ModelViewSet):
         """
         واحدها را بر اساس ساختمان مشخص شده در URL فیلتر می‌کند.
         """
-        building_pk = self.kwargs.get('building_pk')
-        building = get_object_or_404(Building, pk=building_pk)
-        return Unit.objects.filter(building=building)
+        building = resolve_access(self.request, self).building
+        return Unit.objects.filter(building=building).select_related('resident')
 
     def perform_create(self, serializer):
         """
         واحد جدید را به ساختمان مشخص شده در URL مرتبط می‌کند.
         """
-        building_pk = self.kwargs.get('building_pk')
-        building = get_object_or_404(Building, pk=building_pk)
-        serializer.save(building=building)
+        serializer.save(building=resolve_access(self.request, self).building)
 
     def get_permissions(self):
         """
-        فقط مدیر ساختمان می‌تواند واحدها را مدیریت (ایجاد، ویرایش، حذف) کند.
+        فقط مدیر ساختمان می‌تواند واحدها را مدیریت (ایجاد، ویرایش، حذف) کند و
+        مشاهده واحدها مخصوص مدیر و ساکنین همان ساختمان است.
         """
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
             self.permission_classes = [IsManagerOfBuildingPermission]
+        else:
+            self.permission_classes = [IsBuildingMemberPermission]
         return super().get_permissions()
 
+    def perform_destroy(self, instance):
+        """
+        پرداخت‌های واحد حذف‌شده از دفتر ساختمان نیز کسر می‌شوند.
+        """
+        paid = (
+            instance.maintenance_fees.filter(is_paid=True)
+            .annotate(day=Coalesce('payment_date', 'due_date'))
+            .values('day')
+            .annotate(total=Sum('amount'))
+            .values_list('day', 'total')
+        )
+        with transaction.atomic():
+            for day, total in paid:
+                ledger.record(instance.building_id, day, income=-total)
+            instance.delete()
+
 
 # --- Custom Permissions ---
 
@@ -129,12 +337,27 @@ class IsManagerOfBuildingPermission(permissions.BasePermission):
     اجازه دسترسی فقط به مدیر ساختمانی که از URL گرفته شده.
     """
     def has_permission(self, request, view):
-        building_pk = view.kwargs.get('building_pk')
-        building = get_object_or_404(Building, pk=building_pk)
-        return building.manager == request.user
+        return request.user.is_authenticated and resolve_access(request, view).is_manager
 
+class IsBuildingMemberPermission(permissions.BasePermission):
+    """
+    اجازه دسترسی به مدیر و ساکنین ساختمانی که از URL گرفته شده.
+    """
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and resolve_access(request, view).is_member
 
-class BuildingExpenseViewSet(viewsets.ModelViewSet):
+class CanViewUnitFeesPermission(permissions.BasePermission):
+    """
+    اجازه مشاهده شارژهای یک واحد به مدیر ساختمان و ساکن همان واحد.
+    """
+    def has_permission(self, request, view):
+        if not request.user.is_authenticated:
+            return False
+        access = resolve_access(request, view)
+        return access.is_manager or access.is_unit_resident
+
+
+class BuildingExpenseViewSet(BuildingVersionMixin, viewsets.ModelViewSet):
     """
     API for managing building expenses. Only the building manager can create/edit/delete.
     """
@@ -142,16 +365,34 @@ class BuildingExpenseViewSet(viewsets.ModelViewSet):
     permission_classes = [IsManagerOfBuildingPermission]
 
     def get_queryset(self):
-        building_pk = self.kwargs.get('building_pk')
-        return BuildingExpense.objects.filter(building_id=building_pk)
+        return BuildingExpense.objects.filter(building=resolve_access(self.request, self).building)
 
     def perform_create(self, serializer):
-        building_pk = self.kwargs.get('building_pk')
-        building = get_object_or_404(Building, pk=building_pk)
-        serializer.save(building=building)
-
-
-class MaintenanceFeeViewSet(viewsets.ModelViewSet):
+        building = resolve_access(self.request, self).building
+        with transaction.atomic():
+            expense = serializer.save(building=building)
+            ledger.record(building.pk, expense.date, expenses=expense.amount)
+
+    def perform_update(self, serializer):
+        amount = serializer.validated_data.get('amount')
+        if amount is not None and amount != serializer.instance.amount and serializer.instance.allocated_fees.exists():
+            raise ValidationError({'amount': 'This expense is already split between the units.'})
+        old_date, old_amount = serializer.instance.date, serializer.instance.amount
+        with transaction.atomic():
+            expense = serializer.save()
+            ledger.record(expense.building_id, old_date, expenses=-old_amount)
+            ledger.record(expense.building_id, expense.date, expenses=expense.amount)
+
+    def perform_destroy(self, instance):
+        # Unpaid shares go with the expense; paid ones are payment records.
+        if instance.allocated_fees.filter(is_paid=True).exists():
+            raise ValidationError({'detail': 'Some units have already paid their share of this expense.'})
+        with transaction.atomic():
+            ledger.record(instance.building_id, instance.date, expenses=-instance.amount)
+            instance.delete()
+
+
+class MaintenanceFeeViewSet(BuildingVersionMixin, viewsets.ModelViewSet):
     """
     API for managing monthly maintenance fees (sharj).
     - Manager can create/edit/delete fees for any unit.
@@ -160,18 +401,40 @@ class MaintenanceFeeViewSet(viewsets.ModelViewSet):
     serializer_class = MaintenanceFeeSerializer
 
     def get_queryset(self):
-        unit_pk = self.kwargs.get('unit_pk')
-        return MaintenanceFee.objects.filter(unit_id=unit_pk)
+        # Every fee belongs to the unit resolved for this request, so the nested
+        # unit (and its resident) come from the same join instead of per-row queries.
+        return MaintenanceFee.objects.filter(unit=resolve_access(self.request, self).unit).select_related('unit__resident')
 
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
             return [IsManagerOfBuildingViaUnitPermission()]
-        return [permissions.IsAuthenticated()]
+        return [CanViewUnitFeesPermission()]
 
     def perform_create(self, serializer):
-        unit_pk = self.kwargs.get('unit_pk')
-        unit = get_object_or_404(Unit, pk=unit_pk)
-        serializer.save(unit=unit)
+        self.save_fee(serializer, unit=resolve_access(self.request, self).unit)
+
+    def perform_update(self, serializer):
+        fee = serializer.instance
+        old_amount = fee.amount
+        building = resolve_access(self.request, self).building
+        with transaction.atomic():
+            self.save_fee(serializer)
+            if fee.is_paid and fee.amount != old_amount:
+                ledger.record(building.pk, fee.payment_date or fee.due_date, income=fee.amount - old_amount)
+
+    def perform_destroy(self, instance):
+        building = resolve_access(self.request, self).building
+        with transaction.atomic():
+            if instance.is_paid:
+                ledger.record(building.pk, instance.payment_date or instance.due_date, income=-instance.amount)
+            instance.delete()
+
+    def save_fee(self, serializer, **kwargs):
+        try:
+            with transaction.atomic():
+                serializer.save(**kwargs)
+        except IntegrityError:
+            raise ValidationError({'due_date': 'This unit already has a fee for this due date.'})
 
     @action(detail=True, methods=['post'])
     def pay(self, request, building_pk=None, unit_pk=None, pk=None):
@@ -179,22 +442,24 @@ class MaintenanceFeeViewSet(viewsets.ModelViewSet):
         Marks a maintenance fee as paid. Can only be done by the resident of the unit.
         """
         fee = self.get_object()
-        if fee.unit.resident != request.user:
+        access = resolve_access(request, self)
+        if not access.is_unit_resident:
             return Response({'error': 'You can only pay fees for your own unit.'}, status=status.HTTP_403_FORBIDDEN)
 
-        fee.is_paid = True
-        fee.payment_date = timezone.now().date()
-        fee.save()
+        today = timezone.localdate()
+        with transaction.atomic():
+            # Only the request that flips is_paid records the payment, so a
+            # repeated or concurrent "pay" cannot count the fee twice.
+            if MaintenanceFee.objects.filter(pk=fee.pk, is_paid=False).update(is_paid=True, payment_date=today):
+                ledger.record(access.building.pk, today, income=fee.amount)
+        fee.refresh_from_db(fields=['is_paid', 'payment_date'])
         serializer = self.get_serializer(fee)
         return Response(serializer.data)
 
 
-class IsManagerOfBuildingViaUnitPermission(permissions.BasePermission):
+class IsManagerOfBuildingViaUnitPermission(IsManagerOfBuildingPermission):
     """
     Permission to check if the user is the manager of the building
-    that the unit belongs to.
+    that the unit belongs to. The unit is resolved within the building of
+    the URL, together with the building, by the shared request resolver.
     """
-    def has_permission(self, request, view):
-        unit_pk = view.kwargs.get('unit_pk')
-        unit = get_object_or_404(Unit, pk=unit_pk)
-        return unit.building.manager == request.user
@@ -11,11 +11,19 @@ from .serializers import (
     ShoppingItemSerializer,
 )
 from django.shortcuts import get_object_or_404
+from finances.versioning import DataVersionMixin
 
 User = get_user_model()
 
 
-class TodoListViewSet(viewsets.ModelViewSet):
+class CoreVersionMixin(DataVersionMixin):
+    # A write to a list bumps the counters of its owner and everyone it is shared with.
+    version_resource = 'core'
+    audience_fields = ('user', 'shared_with')
+
+
+class TodoListViewSet(CoreVersionMixin, viewsets.ModelViewSet):
+    audience_model = TodoList
     serializer_class = TodoListSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -58,7 +66,9 @@ class TodoListViewSet(viewsets.ModelViewSet):
         return Response({'status': f"list {'archived' if todolist.is_archived else 'unarchived'}"})
 
 
-class TodoItemViewSet(viewsets.ModelViewSet):
+class TodoItemViewSet(CoreVersionMixin, viewsets.ModelViewSet):
+    audience_model = TodoList
+    audience_kwarg = 'todolist_pk'
     serializer_class = TodoItemSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -79,7 +89,8 @@ class TodoItemViewSet(viewsets.ModelViewSet):
         serializer.save(todolist=todolist)
 
 
-class ShoppingListViewSet(viewsets.ModelViewSet):
+class ShoppingListViewSet(CoreVersionMixin, viewsets.ModelViewSet):
+    audience_model = ShoppingList
     serializer_class = ShoppingListSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -122,7 +133,9 @@ class ShoppingListViewSet(viewsets.ModelViewSet):
         return Response({'status': f"list {'archived' if shoppinglist.is_archived else 'unarchived'}"})
 
 
-class ShoppingItemViewSet(viewsets.ModelViewSet):
+class ShoppingItemViewSet(CoreVersionMixin, viewsets.ModelViewSet):
+    audience_model = ShoppingList
+    audience_kwarg = 'shoppinglist_pk'
     serializer_class = ShoppingItemSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -5,12 +5,19 @@ from .models import (
     Tag,
     Budget,
     Wallet,
+    WalletTransaction,
+    WalletTransfer,
     Income,
     Expense,
     Debt,
     Credit,
     Installment,
     InstallmentDetail,
+    MonthlyRollup,
+    DataVersion,
+    RecurringTransaction,
+    Tombstone,
+    SpendingProfile,
 )
 
 admin.site.register(Person)
@@ -18,9 +25,16 @@ admin.site.register(Category)
 admin.site.register(Tag)
 admin.site.register(Budget)
 admin.site.register(Wallet)
+admin.site.register(WalletTransaction)
+admin.site.register(WalletTransfer)
 admin.site.register(Income)
 admin.site.register(Expense)
 admin.site.register(Debt)
 admin.site.register(Credit)
 admin.site.register(Installment)
 admin.site.register(InstallmentDetail)
+admin.site.register(MonthlyRollup)
+admin.site.register(DataVersion)
+admin.site.register(RecurringTransaction)
+admin.site.register(Tombstone)
+admin.site.register(SpendingProfile)
@@ -1,5 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 class FinancesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "finances"
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .search import create_search_table
+
+        post_migrate.connect(create_search_table, sender=self)
@@ -0,0 +1,49 @@
+# finances/balances.py
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from .models import Debt, Credit, Income, Expense
+
+EMPTY_BALANCE = {
+    'credit': 0,
+    'debt': 0,
+    'overdue_credit': 0,
+    'overdue_debt': 0,
+    'received': 0,
+    'paid': 0,
+}
+
+
+def person_balances(user, person_ids=None):
+    """
+    Net position per person, built from one grouped aggregate per table.
+
+    ``credit`` is what the person owes the user, ``debt`` what the user owes
+    them; ``net`` is ``credit - debt`` (positive: they owe you). Overdue
+    totals only count entries whose ``pay_date`` has passed. ``received`` and
+    ``paid`` are the incomes from / expenses to that person.
+    """
+    now = timezone.now()
+    balances = {}
+
+    def collect(queryset, **aggregates):
+        queryset = queryset.filter(user=user, person__isnull=False)
+        if person_ids is not None:
+            queryset = queryset.filter(person_id__in=person_ids)
+        for row in queryset.values('person_id').annotate(**aggregates).order_by():
+            balance = balances.setdefault(row.pop('person_id'), dict(EMPTY_BALANCE))
+            for key, value in row.items():
+                balance[key] = value or 0
+
+    collect(Credit.objects, credit=Sum('amount'), overdue_credit=Sum('amount', filter=Q(pay_date__lt=now)))
+    collect(Debt.objects, debt=Sum('amount'), overdue_debt=Sum('amount', filter=Q(pay_date__lt=now)))
+    collect(Income.objects, received=Sum('amount'))
+    collect(Expense.objects, paid=Sum('amount'))
+
+    for balance in balances.values():
+        balance['net'] = balance['credit'] - balance['debt']
+    return balances
+
+
+def empty_balance():
+    return {**EMPTY_BALANCE, 'net': 0}
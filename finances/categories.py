@@ -0,0 +1,30 @@
+# finances/categories.py
+from collections import defaultdict
+
+from .models import Category
+
+
+def build_children_map(user):
+    """
+    Load every category of the user in one query and index them by parent id.
+
+    Top-level categories are stored under the ``None`` key.
+    """
+    children_map = defaultdict(list)
+    for category in Category.objects.filter(user=user).order_by('id'):
+        children_map[category.parent_id].append(category)
+    return children_map
+
+
+def descendant_ids(children_map, root_id):
+    """
+    Return the ids of ``root_id`` and all of its descendants, walking the
+    in-memory map built by ``build_children_map``.
+    """
+    ids = []
+    stack = [root_id]
+    while stack:
+        category_id = stack.pop()
+        ids.append(category_id)
+        stack.extend(child.id for child in children_map.get(category_id, []))
+    return ids
@@ -0,0 +1,113 @@
+# finances/dashboard.py
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import Sum
+from django.utils import timezone
+
+from .jalali import current_jalali_month
+from .models import Category, Wallet, MonthlyRollup, Debt, Credit, InstallmentDetail
+from .versioning import get_version
+
+DASHBOARD_CACHE_TIMEOUT = 10 * 60
+UPCOMING_DAYS = 30
+
+
+def get_dashboard(user):
+    """
+    Return the home-screen payload, cached per user.
+
+    The key holds the user's finance data version and the current Jalali
+    month, so any write through the finance API or a new month yields a
+    fresh key. The short timeout keeps the "upcoming" windows current.
+
+    The upcoming debts, credits and installment payments are the open ones
+    that are overdue or due within UPCOMING_DAYS, like
+    ``installments/upcoming``: a debt or credit is open until it is deleted,
+    an installment payment until it is marked paid.
+    """
+    year, month = current_jalali_month()
+    key = f"dashboard:{user.pk}:{get_version(user.pk)}:{year}-{month}"
+    payload = cache.get(key)
+    if payload is None:
+        payload = build_dashboard(user, year, month)
+        cache.set(key, payload, DASHBOARD_CACHE_TIMEOUT)
+    return payload
+
+
+def build_dashboard(user, year, month):
+    horizon = timezone.now() + timedelta(days=UPCOMING_DAYS)
+
+    wallets = list(Wallet.objects.filter(user=user).order_by('id').values('id', 'name', 'balance'))
+
+    category_names = dict(Category.objects.filter(user=user).values_list('id', 'name'))
+    totals = {'income': {}, 'expense': {}}
+    rollups = (
+        MonthlyRollup.objects.filter(user=user, year=year, month=month)
+        .values('kind', 'category_id')
+        .annotate(total=Sum('total'))
+        .values_list('kind', 'category_id', 'total')
+    )
+    for kind, category_id, total in rollups:
+        # Rollups of deleted categories read as uncategorized.
+        if category_id not in category_names:
+            category_id = None
+        totals[kind][category_id] = totals[kind].get(category_id, 0) + total
+
+    def by_category(kind):
+        return [
+            {'category': category_id, 'name': category_names.get(category_id), 'total': total}
+            for category_id, total in sorted(totals[kind].items(), key=lambda item: -item[1])
+        ]
+
+    def upcoming(model):
+        rows = (
+            model.objects.filter(user=user, pay_date__lt=horizon)
+            .order_by('pay_date')
+            .values('id', 'amount', 'text', 'pay_date', 'person_id', 'person__first_name', 'person__last_name')
+        )
+        return [
+            {
+                'id': row['id'],
+                'amount': row['amount'],
+                'text': row['text'],
+                'pay_date': timezone.localtime(row['pay_date']),
+                'person': row['person_id'],
+                'person_name': f"{row['person__first_name']} {row['person__last_name'] or ''}".strip()
+                if row['person_id'] else None,
+            }
+            for row in rows
+        ]
+
+    installments = list(
+        InstallmentDetail.objects.filter(
+            installment__user=user, payment_status='unpaid', payment_date__lt=horizon
+        )
+        .order_by('payment_date', 'id')
+        .values('id', 'installment_id', 'installment__text', 'inst_num', 'payment_date', 'amount')
+    )
+
+    return {
+        'wallets': wallets,
+        'month': {
+            'year': year,
+            'month': month,
+            'income_total': sum(totals['income'].values()),
+            'expense_total': sum(totals['expense'].values()),
+            'income_by_category': by_category('income'),
+            'expense_by_category': by_category('expense'),
+        },
+        'upcoming_debts': upcoming(Debt),
+        'upcoming_credits': upcoming(Credit),
+        'upcoming_installments': [
+            {
+                'id': row['id'],
+                'installment_id': row['installment_id'],
+                'text': row['installment__text'],
+                'inst_num': row['inst_num'],
+                'payment_date': timezone.localtime(row['payment_date']),
+                'amount': row['amount'],
+            }
+            for row in installments
+        ],
+    }
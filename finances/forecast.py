@@ -0,0 +1,176 @@
+# finances/forecast.py
+from datetime import timedelta
+from itertools import groupby
+from statistics import median
+
+from django.core.cache import cache
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .jalali import current_jalali_month, jalali_month_bounds
+from .models import Category, Expense, SpendingProfile
+from .versioning import get_version
+
+FORECAST_CACHE_TIMEOUT = 60 * 60
+# Days of spending before the current month that form the baseline.
+HISTORY_DAYS = 90
+# A category needs this many spending days before its days are judged.
+MIN_SAMPLES = 5
+# Robust z-score above which a day's spending in a category is flagged.
+ANOMALY_THRESHOLD = 3.5
+
+
+def daily_totals(queryset):
+    """Group expenses into ``(user_id, category_id, day, total)`` rows, ordered by user."""
+    return (
+        queryset.annotate(day=TruncDate('date'))
+        .values('user_id', 'category_id', 'day')
+        .annotate(total=Sum('amount'))
+        .order_by('user_id', 'category_id', 'day')
+        .values_list('user_id', 'category_id', 'day', 'total')
+    )
+
+
+def robust_scale(values, center):
+    """MAD scaled to a standard deviation, with the mean absolute deviation as fallback."""
+    deviations = [abs(value - center) for value in values]
+    mad = median(deviations)
+    if mad:
+        return 1.4826 * mad
+    return 1.2533 * sum(deviations) / len(deviations)
+
+
+def build_baseline(rows, window_days):
+    """
+    Summarize one user's ``(category_id, day, total)`` history: the average
+    daily spend of each category over the window, and the median and robust
+    spread of the totals on days it was spent on.
+    """
+    baseline = []
+    for category_id, category_rows in groupby(rows, key=lambda row: row[0]):
+        totals = [total for _, _, total in category_rows]
+        center = median(totals)
+        baseline.append({
+            'category': category_id,
+            'daily_rate': sum(totals) / window_days,
+            'median': center,
+            'scale': robust_scale(totals, center),
+            'samples': len(totals),
+        })
+    return baseline
+
+
+def history_window(year, month):
+    start, _ = jalali_month_bounds(year, month)
+    return start - timedelta(days=HISTORY_DAYS), start
+
+
+def compute_profiles(year, month, user_ids=None):
+    """
+    Recompute the spending baselines of all users (or ``user_ids``) for a
+    Jalali month from one grouped query over the history window. Returns
+    the number of profiles written.
+    """
+    window_start, window_end = history_window(year, month)
+    expenses = Expense.objects.filter(date__gte=window_start, date__lt=window_end)
+    if user_ids is not None:
+        expenses = expenses.filter(user_id__in=user_ids)
+
+    profiles = []
+    for user_id, rows in groupby(daily_totals(expenses).iterator(), key=lambda row: row[0]):
+        baseline = build_baseline([row[1:] for row in rows], HISTORY_DAYS)
+        profiles.append(SpendingProfile(user_id=user_id, year=year, month=month, baseline=baseline))
+    # Users without history in the window still get an (empty) profile for
+    # the month, so the endpoint does not recompute it on every request.
+    seen = {profile.user_id for profile in profiles}
+    for user_id in user_ids or ():
+        if user_id not in seen:
+            profiles.append(SpendingProfile(user_id=user_id, year=year, month=month, baseline=[]))
+
+    SpendingProfile.objects.bulk_create(
+        profiles, batch_size=500, update_conflicts=True,
+        unique_fields=['user'], update_fields=['year', 'month', 'baseline', 'computed_at'],
+    )
+    return len(profiles)
+
+
+def get_profile(user, year, month):
+    profile = SpendingProfile.objects.filter(user=user, year=year, month=month).first()
+    if profile is None:
+        compute_profiles(year, month, user_ids=[user.pk])
+        profile = SpendingProfile.objects.get(user=user)
+    return profile
+
+
+def get_forecast(user):
+    """
+    Return the month-end projection and this month's anomalies, cached per
+    user. The baseline is precomputed (nightly, or on first use in a month);
+    only the current month's expenses are read again after a finance write
+    bumps the data version.
+    """
+    year, month = current_jalali_month()
+    today = timezone.localdate()
+    key = f"forecast:{user.pk}:{get_version(user.pk)}:{year}-{month}:{today}"
+    payload = cache.get(key)
+    if payload is None:
+        payload = build_forecast(user, year, month, today)
+        cache.set(key, payload, FORECAST_CACHE_TIMEOUT)
+    return payload
+
+
+def build_forecast(user, year, month, today):
+    start, end = jalali_month_bounds(year, month)
+    days_in_month = (end - start).days
+    days_elapsed = (today - timezone.localtime(start).date()).days + 1
+    days_left = days_in_month - days_elapsed
+
+    baseline = {row['category']: row for row in get_profile(user, year, month).baseline}
+    category_names = dict(Category.objects.filter(user=user).values_list('id', 'name'))
+
+    spent = {}
+    anomalies = []
+    month_rows = daily_totals(Expense.objects.filter(user=user, date__gte=start, date__lt=end))
+    for _, category_id, day, total in month_rows:
+        spent[category_id] = spent.get(category_id, 0) + total
+        history = baseline.get(category_id)
+        if history and history['samples'] >= MIN_SAMPLES and history['scale']:
+            score = (total - history['median']) / history['scale']
+            if score > ANOMALY_THRESHOLD:
+                anomalies.append({
+                    'date': day,
+                    'category': category_id,
+                    'name': category_names.get(category_id),
+                    'amount': total,
+                    'typical': round(history['median']),
+                    'score': round(score, 2),
+                })
+
+    categories = []
+    for category_id in set(spent) | set(baseline):
+        category_spent = spent.get(category_id, 0)
+        if category_id in baseline:
+            daily_rate = baseline[category_id]['daily_rate']
+        else:
+            # No history yet: extrapolate this month's pace.
+            daily_rate = category_spent / days_elapsed
+        categories.append({
+            'category': category_id,
+            'name': category_names.get(category_id),
+            'spent': category_spent,
+            'projected': round(category_spent + daily_rate * days_left),
+        })
+    categories.sort(key=lambda row: -row['projected'])
+    anomalies.sort(key=lambda row: -row['score'])
+
+    return {
+        'year': year,
+        'month': month,
+        'days_in_month': days_in_month,
+        'days_elapsed': days_elapsed,
+        'spent': sum(spent.values()),
+        'projected': sum(row['projected'] for row in categories),
+        'categories': categories,
+        'anomalies': anomalies,
+    }
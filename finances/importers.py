@@ -0,0 +1,151 @@
+# finances/importers.py
+import csv
+import io
+from collections import defaultdict
+from datetime import datetime
+
+import jdatetime
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Category, Tag, Person, Wallet, Income, Expense
+from .services import apply_wallet_deltas, RollupDeltas, apply_rollup_deltas
+from .search import index_rows
+
+INCOME_TYPES = {'income', 'درآمد'}
+EXPENSE_TYPES = {'expense', 'هزینه'}
+MAX_REPORTED_ERRORS = 1000
+
+
+class TransactionImporter:
+    """
+    Import incomes and expenses from a CSV file.
+
+    Expected header: ``type,amount,date,text,category,tag,person,wallet``.
+    ``type`` is ``income`` or ``expense``; ``date`` is ``YYYY-MM-DD`` (optionally
+    with ``HH:MM``) in either the Gregorian or the Jalali calendar. Related
+    objects are matched by name against lookups loaded once up front, rows are
+    written with chunked ``bulk_create`` and each wallet receives one
+    aggregated balance change and monthly rollup update at the end.
+    """
+    batch_size = 1000
+
+    def __init__(self, user):
+        self.user = user
+        self.created = {'income': 0, 'expense': 0}
+        self.errors = []
+        self.error_count = 0
+        self.wallet_deltas = defaultdict(int)
+        self.rollups = RollupDeltas()
+        self.pending = {Income: [], Expense: []}
+        self._load_lookups()
+
+    def _load_lookups(self):
+        self.categories = {}
+        for category_id, name, is_income in Category.objects.filter(user=self.user).values_list('id', 'name', 'is_income'):
+            self.categories.setdefault((is_income, name.strip()), category_id)
+        self.tags = {name.strip(): tag_id for tag_id, name in Tag.objects.filter(user=self.user).values_list('id', 'name')}
+        self.wallets = {name.strip(): wallet_id for wallet_id, name in Wallet.objects.filter(user=self.user).values_list('id', 'name')}
+        self.persons = {}
+        for person_id, first_name, last_name in Person.objects.filter(user=self.user).values_list('id', 'first_name', 'last_name'):
+            self.persons.setdefault(f"{first_name} {last_name or ''}".strip(), person_id)
+
+    def run(self, fileobj):
+        stream = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+        reader = csv.DictReader(stream)
+        with transaction.atomic():
+            # Line 1 is the header, so data rows start at 2.
+            for line_number, row in enumerate(reader, start=2):
+                self._add_row(line_number, row)
+                if len(self.pending[Income]) + len(self.pending[Expense]) >= self.batch_size:
+                    self._flush()
+            self._flush()
+            apply_wallet_deltas(self.wallet_deltas, 'import')
+            apply_rollup_deltas(self.rollups)
+        stream.detach()
+        return {
+            'created': self.created,
+            'error_count': self.error_count,
+            'errors': self.errors,
+        }
+
+    def _add_row(self, line_number, row):
+        errors = {}
+        row = {key.strip().lower(): (value or '').strip() for key, value in row.items() if key}
+
+        kind = row.get('type', '').lower()
+        if kind in INCOME_TYPES:
+            model, sign, kind_name = Income, 1, 'income'
+        elif kind in EXPENSE_TYPES:
+            model, sign, kind_name = Expense, -1, 'expense'
+        else:
+            errors['type'] = "Must be 'income' or 'expense'."
+
+        try:
+            amount = int(row.get('amount', '').replace(',', ''))
+            if amount <= 0:
+                raise ValueError
+        except ValueError:
+            errors['amount'] = "Must be a positive integer."
+
+        try:
+            date = self._parse_date(row.get('date', ''))
+        except ValueError:
+            errors['date'] = "Expected YYYY-MM-DD or YYYY-MM-DD HH:MM."
+
+        related = {}
+        lookups = (
+            ('category', lambda name: self.categories.get((kind in INCOME_TYPES, name))),
+            ('tag', self.tags.get),
+            ('person', self.persons.get),
+            ('wallet', self.wallets.get),
+        )
+        for field, lookup in lookups:
+            name = row.get(field)
+            if not name:
+                continue
+            related[f'{field}_id'] = lookup(name)
+            if related[f'{field}_id'] is None:
+                errors[field] = f"No {field} named '{name}'."
+
+        if errors:
+            self.error_count += 1
+            if len(self.errors) < MAX_REPORTED_ERRORS:
+                self.errors.append({'row': line_number, 'errors': errors})
+            return
+
+        obj = model(
+            user=self.user,
+            amount=amount,
+            date=date,
+            text=row.get('text', '')[:30],
+            **related,
+        )
+        obj.fill_jalali_fields()  # bulk_create skips save()
+        self.pending[model].append(obj)
+        self.rollups.add(kind_name, obj)
+        if related.get('wallet_id'):
+            self.wallet_deltas[related['wallet_id']] += sign * amount
+
+    def _flush(self):
+        for model, objects in self.pending.items():
+            if objects:
+                kind = 'income' if model is Income else 'expense'
+                model.objects.bulk_create(objects)
+                index_rows(kind, model, [obj.pk for obj in objects])
+                self.created[kind] += len(objects)
+                objects.clear()
+
+    @staticmethod
+    def _parse_date(value):
+        for fmt in ('%Y-%m-%d %H:%M', '%Y-%m-%d', '%Y/%m/%d %H:%M', '%Y/%m/%d'):
+            try:
+                parsed = datetime.strptime(value, fmt)
+                break
+            except ValueError:
+                continue
+        else:
+            raise ValueError(value)
+        if parsed.year < 1700:
+            parsed = jdatetime.datetime(parsed.year, parsed.month, parsed.day, parsed.hour, parsed.minute).togregorian()
+        return timezone.make_aware(parsed)
@@ -0,0 +1,67 @@
+# finances/installments.py
+from .jalali import add_jalali_months
+from .models import InstallmentDetail
+
+SCHEDULE_FIELDS = ('amount', 'first_date', 'pay_period', 'inst_num', 'inst_rate')
+
+
+def schedule_total(installment):
+    """
+    Total amount repaid over the installment's life.
+
+    ``inst_rate`` is read as a yearly percentage. With a rate, every payment
+    is the fixed annuity amount ``P·r / (1 - (1 + r)^-n)`` for the per-period
+    rate ``r``, so the whole schedule follows from one closed-form value
+    instead of an amortization loop.
+    """
+    count = installment.inst_num
+    rate = (installment.inst_rate or 0) / 100 * installment.pay_period / 12
+    if not rate:
+        return installment.amount
+    return round(installment.amount * rate / (1 - (1 + rate) ** -count) * count)
+
+
+def build_schedule(installment, total=None, skip=()):
+    """
+    Return unsaved InstallmentDetail rows spreading ``total`` (the full
+    schedule total by default) evenly over the installments not in ``skip``.
+
+    Amounts are whole Rials; the rounding remainder goes to the last payment
+    so the rows sum exactly to the total. Due dates advance by ``pay_period``
+    Jalali months from ``first_date``.
+    """
+    if total is None:
+        total = schedule_total(installment)
+    numbers = [number for number in range(1, installment.inst_num + 1) if number not in skip]
+    if not numbers:
+        return []
+
+    payment, remainder = divmod(total, len(numbers))
+    return [
+        InstallmentDetail(
+            installment=installment,
+            inst_num=number,
+            payment_status='unpaid',
+            payment_date=add_jalali_months(installment.first_date, (number - 1) * installment.pay_period),
+            amount=payment + (remainder if number == numbers[-1] else 0),
+        )
+        for number in numbers
+    ]
+
+
+def generate_schedule(installment):
+    """Create every InstallmentDetail of a new installment in one insert."""
+    return InstallmentDetail.objects.bulk_create(build_schedule(installment))
+
+
+def regenerate_unpaid(installment):
+    """
+    Rebuild the unpaid part of the schedule after the terms changed. Paid rows
+    are kept and whatever is still owed under the new terms is spread over
+    the remaining installments.
+    """
+    details = installment.details.all()
+    paid = dict(details.filter(payment_status='paid').values_list('inst_num', 'amount'))
+    details.filter(payment_status='unpaid').delete()
+    outstanding = max(schedule_total(installment) - sum(paid.values()), 0)
+    return InstallmentDetail.objects.bulk_create(build_schedule(installment, outstanding, skip=paid))
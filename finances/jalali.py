@@ -0,0 +1,63 @@
+# finances/jalali.py
+from datetime import datetime, time
+
+import jdatetime
+from django.utils import timezone
+
+
+def jalali_month(value):
+    """Return the (year, month) of an aware datetime in the local Jalali calendar."""
+    local_date = timezone.localtime(value).date()
+    jalali_date = jdatetime.date.fromgregorian(date=local_date)
+    return jalali_date.year, jalali_date.month
+
+
+def jalali_parts(value):
+    """
+    Return ``(year, month, week)`` of an aware datetime in the local Jalali
+    calendar. Weeks start on Saturday; week 1 is the one containing
+    1 Farvardin.
+    """
+    local_date = timezone.localtime(value).date()
+    jalali_date = jdatetime.date.fromgregorian(date=local_date)
+    new_year_weekday = jdatetime.date(jalali_date.year, 1, 1).weekday()  # Saturday == 0
+    week = (jalali_date.yday() - 1 + new_year_weekday) // 7 + 1
+    return jalali_date.year, jalali_date.month, week
+
+
+def current_jalali_month():
+    return jalali_month(timezone.now())
+
+
+def jalali_month_bounds(year, month):
+    """
+    Return the aware ``[start, end)`` datetimes that cover a Jalali month in
+    local time, suitable for ``date__gte`` / ``date__lt`` range filters.
+    """
+    start = jdatetime.date(year, month, 1).togregorian()
+    if month == 12:
+        end = jdatetime.date(year + 1, 1, 1).togregorian()
+    else:
+        end = jdatetime.date(year, month + 1, 1).togregorian()
+    return (
+        timezone.make_aware(datetime.combine(start, time.min)),
+        timezone.make_aware(datetime.combine(end, time.min)),
+    )
+
+
+def add_jalali_months(value, months):
+    """
+    Shift an aware datetime by whole Jalali months, keeping the local time of
+    day. The day is clamped to the length of the target month (e.g. the 31st
+    of Shahrivar plus one month is the 30th of Mehr).
+    """
+    local = timezone.localtime(value)
+    jalali = jdatetime.datetime.fromgregorian(datetime=local.replace(tzinfo=None))
+    month_index = jalali.year * 12 + (jalali.month - 1) + months
+    year, month = divmod(month_index, 12)
+    month += 1
+    days_in_month = jdatetime.j_days_in_month[month - 1]
+    if month == 12 and jdatetime.date(year, 1, 1).isleap():
+        days_in_month += 1
+    shifted = jdatetime.datetime(year, month, min(jalali.day, days_in_month), local.hour, local.minute, local.second)
+    return timezone.make_aware(shifted.togregorian())
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from finances.jalali import jalali_parts
+from finances.models import Income, Expense
+
+
+class Command(BaseCommand):
+    help = "Fill the stored Jalali year/month/week of incomes and expenses saved before those columns existed."
+
+    batch_size = 2000
+
+    def handle(self, *args, **options):
+        for model in (Income, Expense):
+            updated = 0
+            pending = []
+            rows = model.objects.filter(jalali_year__isnull=True).only('id', 'date')
+            for obj in rows.iterator(chunk_size=self.batch_size):
+                obj.jalali_year, obj.jalali_month, obj.jalali_week = jalali_parts(obj.date)
+                pending.append(obj)
+                if len(pending) >= self.batch_size:
+                    model.objects.bulk_update(pending, ['jalali_year', 'jalali_month', 'jalali_week'])
+                    updated += len(pending)
+                    pending = []
+            if pending:
+                model.objects.bulk_update(pending, ['jalali_year', 'jalali_month', 'jalali_week'])
+                updated += len(pending)
+            self.stdout.write(f"{model.__name__}: {updated} row(s) backfilled.")
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from finances.forecast import compute_profiles
+from finances.jalali import current_jalali_month
+
+
+class Command(BaseCommand):
+    help = "Recompute every user's spending baseline for the current Jalali month (run nightly)."
+
+    def handle(self, *args, **options):
+        year, month = current_jalali_month()
+        count = compute_profiles(year, month)
+        self.stdout.write(f"{count} spending profile(s) computed for {year}/{month}.")
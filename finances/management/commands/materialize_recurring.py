@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from finances.recurring import materialize_due
+
+
+class Command(BaseCommand):
+    help = "Write due occurrences of recurring transactions as incomes/expenses. Safe to run repeatedly."
+
+    def handle(self, *args, **options):
+        created = materialize_due()
+        self.stdout.write(self.style.SUCCESS(f"{created} transaction(s) created."))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from finances.models import Tombstone
+from finances.sync import TOMBSTONE_RETENTION
+
+
+class Command(BaseCommand):
+    help = "Delete sync tombstones older than the retention window; clients with older tokens get a full resync."
+
+    def handle(self, *args, **options):
+        deleted, _ = Tombstone.objects.filter(deleted_at__lt=timezone.now() - TOMBSTONE_RETENTION).delete()
+        self.stdout.write(f"{deleted} tombstone(s) pruned.")
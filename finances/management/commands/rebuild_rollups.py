@@ -0,0 +1,47 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from finances.models import Income, Expense, MonthlyRollup
+
+
+class Command(BaseCommand):
+    help = "Rebuild the MonthlyRollup table from the raw Income and Expense rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help="Only rebuild the rollups of this user id.")
+
+    def handle(self, *args, **options):
+        user_id = options.get('user')
+        # Grouping runs on the stored Jalali columns, so they must be filled.
+        call_command('backfill_jalali_dates', stdout=self.stdout)
+
+        rollups = []
+        for kind, model in (('income', Income), ('expense', Expense)):
+            queryset = model.objects.all()
+            if user_id:
+                queryset = queryset.filter(user_id=user_id)
+            groups = (
+                queryset.values('user_id', 'jalali_year', 'jalali_month', 'category_id', 'wallet_id')
+                .annotate(total=Sum('amount'), count=Count('id'))
+                .order_by()
+            )
+            rollups.extend(
+                MonthlyRollup(
+                    user_id=group['user_id'], kind=kind,
+                    year=group['jalali_year'], month=group['jalali_month'],
+                    category_id=group['category_id'], wallet_id=group['wallet_id'],
+                    total=group['total'], count=group['count'],
+                )
+                for group in groups
+            )
+
+        with transaction.atomic():
+            existing = MonthlyRollup.objects.all()
+            if user_id:
+                existing = existing.filter(user_id=user_id)
+            existing.delete()
+            MonthlyRollup.objects.bulk_create(rollups, batch_size=1000)
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(rollups)} monthly rollup row(s)."))
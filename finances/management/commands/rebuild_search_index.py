@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from finances.models import Income, Expense
+from finances.search import clear_index, create_search_table, fts_enabled, index_rows
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index of incomes and expenses."
+
+    def handle(self, *args, **options):
+        if not fts_enabled():
+            self.stdout.write("Full-text index is only used on SQLite; nothing to do.")
+            return
+
+        create_search_table()
+        clear_index()
+        for kind, model in (('income', Income), ('expense', Expense)):
+            ids = list(model.objects.values_list('pk', flat=True))
+            index_rows(kind, model, ids)
+            self.stdout.write(f"{model.__name__}: {len(ids)} row(s) indexed.")
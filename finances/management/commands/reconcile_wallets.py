@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from finances.models import Wallet, WalletTransaction
+
+
+class Command(BaseCommand):
+    help = "Check every Wallet.balance snapshot against the sum of its ledger entries."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help="Rewrite drifted balances from the ledger.",
+        )
+
+    def handle(self, *args, **options):
+        ledger_totals = dict(
+            WalletTransaction.objects.values('wallet_id')
+            .annotate(total=Sum('amount'))
+            .values_list('wallet_id', 'total')
+        )
+
+        seeded = drifted = 0
+        for wallet in Wallet.objects.only('id', 'name', 'balance').iterator():
+            if wallet.pk not in ledger_totals:
+                # Wallets created before the ledger existed: their current
+                # balance becomes the opening entry.
+                if wallet.balance:
+                    WalletTransaction.objects.create(wallet=wallet, amount=wallet.balance, source='opening')
+                    seeded += 1
+                continue
+
+            expected = ledger_totals[wallet.pk]
+            if wallet.balance == expected:
+                continue
+
+            drifted += 1
+            self.stdout.write(f"Wallet {wallet.pk} ({wallet.name}): balance {wallet.balance}, ledger {expected}")
+            if options['fix']:
+                with transaction.atomic():
+                    total = WalletTransaction.objects.filter(wallet=wallet).aggregate(total=Sum('amount'))['total'] or 0
+                    Wallet.objects.filter(pk=wallet.pk).update(balance=total, updated_at=timezone.now())
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{seeded} wallet(s) seeded with an opening entry, {drifted} drifted."
+        ))
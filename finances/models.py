@@ -1,5 +1,9 @@
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.conf import settings
+from django.utils import timezone
+
+from .jalali import jalali_parts
 
 class Person(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="persons")
@@ -14,6 +18,7 @@ class Person(models.Model):
     last_name = models.CharField(max_length=60, blank=True, null=True)
     relation = models.CharField(max_length=60)
     avatar = models.ImageField(upload_to='persons/', null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.first_name} {self.last_name or ''}"
@@ -23,6 +28,7 @@ class Category(models.Model):
     name = models.CharField(max_length=60)
     parent = models.ForeignKey("self", on_delete=models.CASCADE, null=True, blank=True)
     is_income = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -31,6 +37,7 @@ class Tag(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="tags")
     name = models.CharField(max_length=60)
     description = models.CharField(max_length=100, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -39,6 +46,7 @@ class Budget(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     monthly_budget = models.IntegerField()
     category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.user.username} - {self.monthly_budget}"
@@ -48,11 +56,58 @@ class Wallet(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="wallets")
     name = models.CharField(max_length=60)
     balance = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
 
 
+class WalletTransaction(models.Model):
+    """
+    Append-only ledger of every change applied to a wallet's balance.
+    Wallet.balance is the running snapshot of these rows.
+    """
+    SOURCE_CHOICES = [
+        ("opening", "Opening"),
+        ("adjustment", "Adjustment"),
+        ("income", "Income"),
+        ("expense", "Expense"),
+        ("import", "Import"),
+        ("recurring", "Recurring"),
+        ("transfer", "Transfer"),
+    ]
+
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name="transactions")
+    amount = models.IntegerField()  # signed change applied to the balance
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    source_id = models.PositiveBigIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.wallet} {self.amount:+d} ({self.source})"
+
+
+class WalletTransfer(models.Model):
+    """
+    Money moved between two of the user's wallets. Kept apart from
+    Income/Expense so transfers never show up in income or spending totals.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="wallet_transfers")
+    source = models.ForeignKey(Wallet, on_delete=models.SET_NULL, null=True, related_name="transfers_out")
+    destination = models.ForeignKey(Wallet, on_delete=models.SET_NULL, null=True, related_name="transfers_in")
+    amount = models.PositiveIntegerField()
+    text = models.CharField(max_length=30, blank=True)
+    date = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-date', '-id']
+
+    def __str__(self):
+        return f"{self.source} -> {self.destination}: {self.amount}"
+
+
 class Income(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     wallet = models.ForeignKey(Wallet, on_delete=models.SET_NULL, null=True, blank=True)
@@ -62,10 +117,40 @@ class Income(models.Model):
     amount = models.IntegerField()
     date = models.DateTimeField()
     text = models.CharField(max_length=30)
+    recurring = models.ForeignKey(
+        "RecurringTransaction", on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    # Local Jalali calendar position of `date`, filled on save for GROUP BY reports.
+    jalali_year = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    jalali_month = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    jalali_week = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-date', '-id'], name='income_user_date_id_idx'),
+            models.Index(fields=['user', 'jalali_year', 'jalali_month'], name='income_user_jalali_month_idx'),
+            models.Index(fields=['user', 'jalali_year', 'jalali_week'], name='income_user_jalali_week_idx'),
+            models.Index(fields=['user', 'person'], name='income_user_person_idx'),
+            models.Index(fields=['user', 'updated_at'], name='income_user_updated_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['recurring', 'date'], name='unique_income_occurrence'),
+        ]
 
     def __str__(self):
         return f"{self.text} - {self.amount}"
 
+    def fill_jalali_fields(self):
+        self.jalali_year, self.jalali_month, self.jalali_week = jalali_parts(self.date)
+
+    def save(self, *args, **kwargs):
+        self.fill_jalali_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'date' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'jalali_year', 'jalali_month', 'jalali_week'}
+        super().save(*args, **kwargs)
+
 class Expense(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     wallet = models.ForeignKey(Wallet, on_delete=models.SET_NULL, null=True, blank=True)
@@ -75,11 +160,85 @@ class Expense(models.Model):
     amount = models.IntegerField()
     date = models.DateTimeField()
     text = models.CharField(max_length=30)
+    recurring = models.ForeignKey(
+        "RecurringTransaction", on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
     receipt_image = models.ImageField(upload_to='receipts/', blank=True, null=True)
+    # Generated from receipt_image by finances.receipts.
+    receipt_thumbnail = models.ImageField(upload_to='receipts/', blank=True, null=True, editable=False)
+    receipt_preview = models.ImageField(upload_to='receipts/', blank=True, null=True, editable=False)
+    # Local Jalali calendar position of `date`, filled on save for GROUP BY reports.
+    jalali_year = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    jalali_month = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    jalali_week = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-date', '-id'], name='expense_user_date_id_idx'),
+            models.Index(fields=['user', 'jalali_year', 'jalali_month'], name='expense_user_jalali_month_idx'),
+            models.Index(fields=['user', 'jalali_year', 'jalali_week'], name='expense_user_jalali_week_idx'),
+            models.Index(fields=['user', 'person'], name='expense_user_person_idx'),
+            models.Index(fields=['user', 'updated_at'], name='expense_user_updated_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['recurring', 'date'], name='unique_expense_occurrence'),
+        ]
 
     def __str__(self):
         return f"{self.text} - {self.amount}"
 
+    def fill_jalali_fields(self):
+        self.jalali_year, self.jalali_month, self.jalali_week = jalali_parts(self.date)
+
+    def save(self, *args, **kwargs):
+        self.fill_jalali_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'date' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'jalali_year', 'jalali_month', 'jalali_week'}
+        super().save(*args, **kwargs)
+
+class RecurringTransaction(models.Model):
+    """
+    A template for an income/expense that repeats (rent, salary, ...).
+    Due occurrences are written as real rows by the materialize_recurring
+    command; ``occurrences`` counts how many have been written so far and
+    ``next_run`` is the date of the next one.
+    """
+    KIND_CHOICES = [("income", "Income"), ("expense", "Expense")]
+    INTERVAL_CHOICES = [
+        ("day", "Daily"),
+        ("week", "Weekly"),
+        ("month", "Monthly (Jalali)"),
+        ("year", "Yearly (Jalali)"),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="recurring_transactions")
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    amount = models.IntegerField()
+    text = models.CharField(max_length=30)
+    wallet = models.ForeignKey(Wallet, on_delete=models.SET_NULL, null=True, blank=True)
+    person = models.ForeignKey(Person, on_delete=models.SET_NULL, null=True, blank=True)
+    tag = models.ForeignKey(Tag, on_delete=models.SET_NULL, null=True, blank=True)
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True)
+    interval = models.CharField(max_length=10, choices=INTERVAL_CHOICES, default="month")
+    interval_count = models.PositiveSmallIntegerField(default=1)
+    start_date = models.DateTimeField()
+    end_date = models.DateTimeField(null=True, blank=True)
+    occurrences = models.PositiveIntegerField(default=0)
+    next_run = models.DateTimeField()
+    is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_active', 'next_run'], name='recurring_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.text} ({self.get_interval_display()})"
+
+
 class Debt(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     person = models.ForeignKey(Person, on_delete=models.SET_NULL, null=True, blank=True)
@@ -87,6 +246,12 @@ class Debt(models.Model):
     text = models.CharField(max_length=30)
     date = models.DateTimeField()
     pay_date = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'person'], name='debt_user_person_idx'),
+        ]
 
     def __str__(self):
         return f"Debt: {self.amount}"
@@ -98,6 +263,12 @@ class Credit(models.Model):
     text = models.CharField(max_length=30)
     date = models.DateTimeField()
     pay_date = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'person'], name='credit_user_person_idx'),
+        ]
 
     def __str__(self):
         return f"Credit: {self.amount}"
@@ -111,6 +282,7 @@ class Installment(models.Model):
     pay_period = models.IntegerField()  # 1=monthly, 2=bimonthly
     inst_num = models.IntegerField()
     inst_rate = models.IntegerField(null=True, blank=True)  # interest rate
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.text
@@ -122,5 +294,103 @@ class InstallmentDetail(models.Model):
     payment_date = models.DateTimeField()
     amount = models.IntegerField()
 
+    class Meta:
+        ordering = ['inst_num']
+        indexes = [
+            models.Index(fields=['payment_status', 'payment_date'], name='inst_detail_status_date_idx'),
+        ]
+
     def __str__(self):
         return f"Installment {self.inst_num} - {self.payment_status}"
+
+
+class MonthlyRollup(models.Model):
+    """
+    Running totals of incomes/expenses per user, Jalali month, category and
+    wallet. Kept in step with every write so period reports read a handful of
+    rows instead of scanning the raw tables.
+
+    category/wallet are kept without a DB constraint; deleting one merges
+    its rows into the matching rows without a category/wallet, where its
+    incomes/expenses land once their foreign key is nulled.
+    """
+    KIND_CHOICES = [("income", "Income"), ("expense", "Expense")]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="monthly_rollups")
+    year = models.PositiveSmallIntegerField()  # Jalali
+    month = models.PositiveSmallIntegerField()  # Jalali
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    category = models.ForeignKey(
+        Category, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name="+"
+    )
+    wallet = models.ForeignKey(
+        Wallet, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name="+"
+    )
+    total = models.BigIntegerField(default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                "user", "year", "month", "kind",
+                Coalesce("category", 0), Coalesce("wallet", 0),
+                name="unique_monthly_rollup",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.year}/{self.month} {self.kind}: {self.total}"
+
+
+class DataVersion(models.Model):
+    """
+    Per-user counter bumped on every write to a resource. Cached payloads
+    and ETags embed it, so a bump invalidates them without deleting
+    anything from the cache. Writes to data shared between users (todo
+    lists, groups, buildings) bump the row of every user who can see it.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="data_versions")
+    resource = models.CharField(max_length=30)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'resource')
+
+    def __str__(self):
+        return f"{self.user_id}:{self.resource}@{self.version}"
+
+
+class Tombstone(models.Model):
+    """
+    Records a deleted finance row so offline clients can drop it on their
+    next delta sync.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="tombstones")
+    resource = models.CharField(max_length=30)
+    object_id = models.PositiveBigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'deleted_at'], name='tombstone_user_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.resource}:{self.object_id} deleted"
+
+
+class SpendingProfile(models.Model):
+    """
+    Per-category spending baseline of a user for one Jalali month, built
+    from the days before it by finances.forecast (nightly via the
+    compute_forecasts command).
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="spending_profile")
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    baseline = models.JSONField(default=list)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user_id} baseline for {self.year}/{self.month}"
@@ -0,0 +1,16 @@
+# finances/pagination.py
+from rest_framework.pagination import CursorPagination
+
+
+class TransactionCursorPagination(CursorPagination):
+    """
+    Keyset pagination for income/expense lists.
+
+    Pages are addressed by an opaque cursor pointing at the last (date, id)
+    seen, so every page is a single indexed range scan on (user, date, id)
+    no matter how deep the client has scrolled.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = ('-date', '-id')
@@ -0,0 +1,96 @@
+# finances/receipts.py
+"""
+Receipt image pipeline.
+
+Uploaded receipts are processed off the request thread: the photo is
+rotated per its EXIF orientation, downscaled, re-encoded as JPEG without any
+metadata and stored under a name derived from the SHA-256 of the upload, so
+the same photo uploaded twice is stored once. List and detail thumbnails are
+generated alongside it.
+"""
+import hashlib
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import Expense
+from .versioning import bump_finance_versions
+
+logger = logging.getLogger(__name__)
+
+MAX_SIZE = 1600
+THUMBNAIL_SIZES = {'thumbnail': 200, 'preview': 800}
+JPEG_QUALITY = 82
+PROCESSED_NAME = re.compile(r'^receipts/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$')
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='receipts')
+
+
+def is_processed(name):
+    return bool(PROCESSED_NAME.match(name or ''))
+
+
+def schedule_processing(expense_id):
+    """Queue a receipt for processing once the current transaction commits."""
+    transaction.on_commit(lambda: _executor.submit(_run, expense_id))
+
+
+def _run(expense_id):
+    try:
+        process_receipt(expense_id)
+    except Exception:
+        logger.exception("Processing the receipt of expense %s failed", expense_id)
+    finally:
+        # Worker threads get their own DB connection; don't leak it.
+        connection.close()
+
+
+def _encode(image, size):
+    image = image.copy()
+    image.thumbnail((size, size))
+    buffer = BytesIO()
+    image.save(buffer, format='JPEG', quality=JPEG_QUALITY, optimize=True)
+    return ContentFile(buffer.getvalue())
+
+
+def _store(name, image, size):
+    if not default_storage.exists(name):
+        default_storage.save(name, _encode(image, size))
+    return name
+
+
+def process_receipt(expense_id):
+    expense = Expense.objects.filter(pk=expense_id).only('id', 'user_id', 'receipt_image').first()
+    if expense is None or not expense.receipt_image or is_processed(expense.receipt_image.name):
+        return
+
+    original = expense.receipt_image.name
+    with default_storage.open(original, 'rb') as upload:
+        data = upload.read()
+    digest = hashlib.sha256(data).hexdigest()
+    base = f"receipts/{digest[:2]}/{digest}"
+
+    try:
+        image = Image.open(BytesIO(data))
+        image = ImageOps.exif_transpose(image).convert('RGB')
+    except (UnidentifiedImageError, OSError):
+        logger.warning("Receipt of expense %s is not a readable image", expense_id)
+        return
+
+    names = {'receipt_image': _store(f"{base}.jpg", image, MAX_SIZE)}
+    for label, size in THUMBNAIL_SIZES.items():
+        names[f'receipt_{label}'] = _store(f"{base}_{label}.jpg", image, size)
+
+    # Only swap the files in if the expense still points at this upload.
+    updated = Expense.objects.filter(pk=expense_id, receipt_image=original).update(**names, updated_at=timezone.now())
+    if updated:
+        bump_finance_versions(expense.user_id, 'expenses')
+        if not Expense.objects.filter(receipt_image=original).exists():
+            default_storage.delete(original)
@@ -0,0 +1,127 @@
+# finances/recurring.py
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .jalali import add_jalali_months
+from .models import RecurringTransaction, Income, Expense, Wallet
+from .search import index_rows
+from .services import apply_wallet_deltas, RollupDeltas, apply_rollup_deltas
+from .versioning import bump_finance_versions
+
+RULES_PER_BATCH = 500
+MAX_OCCURRENCES_PER_RUN = 1000
+MODELS = {'income': Income, 'expense': Expense}
+SIGNS = {'income': 1, 'expense': -1}
+
+
+def occurrence_date(rule, index):
+    """
+    Date of the ``index``-th occurrence (0-based), always computed from
+    ``start_date`` so month-end clamping never drifts.
+    """
+    step = index * rule.interval_count
+    if rule.interval == 'day':
+        return rule.start_date + timedelta(days=step)
+    if rule.interval == 'week':
+        return rule.start_date + timedelta(weeks=step)
+    if rule.interval == 'year':
+        step *= 12
+    return add_jalali_months(rule.start_date, step)
+
+
+def materialize_due(now=None):
+    """
+    Write every due occurrence of every active rule as an Income/Expense row.
+
+    Rules are processed in batches, each in one transaction that inserts the
+    rows with bulk_create, applies one ledger entry per wallet, updates the
+    monthly rollups and advances the rules. Occurrences already present for a
+    (rule, date) pair are skipped, and the rows are unique on that pair, so
+    overlapping or repeated runs never duplicate anything.
+    """
+    now = now or timezone.now()
+    created = 0
+    while True:
+        with transaction.atomic():
+            rules = list(
+                RecurringTransaction.objects.select_for_update(skip_locked=True)
+                .filter(is_active=True, next_run__lte=now)
+                .order_by('next_run')[:RULES_PER_BATCH]
+            )
+            if not rules:
+                return created
+            created += _materialize(rules, now)
+
+
+def _materialize(rules, now):
+    due = []
+    for rule in rules:
+        index = rule.occurrences
+        dates = []
+        while len(dates) < MAX_OCCURRENCES_PER_RUN:
+            date = occurrence_date(rule, index)
+            if date > now or (rule.end_date and date > rule.end_date):
+                break
+            dates.append(date)
+            index += 1
+
+        rule.occurrences = index
+        rule.next_run = occurrence_date(rule, index)
+        if rule.end_date and rule.next_run > rule.end_date:
+            rule.is_active = False
+        due.extend((rule, date) for date in dates)
+
+    existing = set()
+    if due:
+        earliest = min(date for rule, date in due)
+        for model in MODELS.values():
+            existing.update(
+                model.objects.filter(recurring__in=rules, date__gte=earliest, date__lte=now)
+                .values_list('recurring_id', 'date')
+            )
+
+    # A rule only ever moves money in its owner's wallets.
+    owned_wallets = set(
+        Wallet.objects.filter(pk__in={rule.wallet_id for rule, date in due if rule.wallet_id})
+        .values_list('pk', 'user_id')
+    )
+
+    pending = defaultdict(list)
+    wallet_deltas = defaultdict(int)
+    rollups = RollupDeltas()
+    for rule, date in due:
+        if (rule.pk, date) in existing:
+            continue
+        obj = MODELS[rule.kind](
+            user_id=rule.user_id,
+            recurring=rule,
+            amount=rule.amount,
+            text=rule.text,
+            date=date,
+            wallet_id=rule.wallet_id,
+            person_id=rule.person_id,
+            tag_id=rule.tag_id,
+            category_id=rule.category_id,
+        )
+        if (obj.wallet_id, rule.user_id) not in owned_wallets:
+            obj.wallet_id = None
+        obj.fill_jalali_fields()
+        pending[rule.kind].append(obj)
+        rollups.add(rule.kind, obj)
+        if obj.wallet_id:
+            wallet_deltas[obj.wallet_id] += SIGNS[rule.kind] * obj.amount
+
+    for kind, objects in pending.items():
+        MODELS[kind].objects.bulk_create(objects, batch_size=1000)
+        index_rows(kind, MODELS[kind], [obj.pk for obj in objects])
+    apply_wallet_deltas(wallet_deltas, 'recurring')
+    apply_rollup_deltas(rollups)
+    RecurringTransaction.objects.bulk_update(rules, ['occurrences', 'next_run', 'is_active'])
+
+    # Every processed rule advanced, whether or not it wrote a row.
+    for user_id in {rule.user_id for rule in rules}:
+        bump_finance_versions(user_id, 'incomes', 'expenses', 'wallets', 'recurring')
+    return sum(len(objects) for objects in pending.values())
@@ -0,0 +1,119 @@
+# finances/search.py
+"""
+Full-text search over incomes and expenses.
+
+On SQLite the rows are mirrored into an FTS5 table holding the text and the
+names of the related person, tag and category. The FTS rowid encodes the
+source row (``id * 2 + kind``) so every row is updated or removed by rowid,
+and each row carries an ``owner`` token so the per-user filter is part of the
+index lookup. Entries are written in the same transaction as the rows they
+mirror. Other databases fall back to ``icontains`` filters.
+"""
+from django.db import connection
+from django.db.models import Q
+
+FTS_TABLE = 'finances_transaction_fts'
+KINDS = {'income': 0, 'expense': 1}
+SEARCH_FIELDS = ('text', 'person__first_name', 'person__last_name', 'tag__name', 'category__name')
+
+
+def fts_enabled():
+    return connection.vendor == 'sqlite'
+
+
+def create_search_table(**kwargs):
+    """post_migrate hook: the FTS5 table is not a Django model, so create it here."""
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            "text, person, tag, category, owner, "
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+
+
+def _rowid(kind, pk):
+    return pk * 2 + KINDS[kind]
+
+
+def index_rows(kind, model, ids):
+    """(Re)write the search entries of the given income/expense ids."""
+    if not fts_enabled() or not ids:
+        return
+    ids = list(ids)
+    with connection.cursor() as cursor:
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            rows = model.objects.filter(pk__in=chunk).values_list('pk', 'user_id', *SEARCH_FIELDS)
+            _delete(cursor, kind, chunk)
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, text, person, tag, category, owner) VALUES (%s, %s, %s, %s, %s, %s)",
+                [
+                    (
+                        _rowid(kind, pk),
+                        text,
+                        f"{first_name or ''} {last_name or ''}".strip(),
+                        tag or '',
+                        category or '',
+                        f"u{user_id}",
+                    )
+                    for pk, user_id, text, first_name, last_name, tag, category in rows
+                ],
+            )
+
+
+def clear_index():
+    if fts_enabled():
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+
+
+def remove_rows(kind, ids):
+    if not fts_enabled() or not ids:
+        return
+    with connection.cursor() as cursor:
+        _delete(cursor, kind, list(ids))
+
+
+def _delete(cursor, kind, ids):
+    placeholders = ', '.join(['%s'] * len(ids))
+    cursor.execute(
+        f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})",
+        [_rowid(kind, pk) for pk in ids],
+    )
+
+
+def _match_expression(user_id, query):
+    terms = [term.replace('"', '""') for term in query.split()]
+    phrases = ' '.join(f'"{term}"*' for term in terms)
+    return f'owner : "u{user_id}" AND {{text person tag category}} : ({phrases})'
+
+
+def search(queryset, kind, user, query, offset, limit):
+    """
+    Return up to ``limit`` rows of ``queryset`` matching ``query``, best match
+    first (bm25) on SQLite, newest first elsewhere.
+    """
+    if not query.split():
+        return []
+
+    if not fts_enabled():
+        condition = Q()
+        for term in query.split():
+            term_condition = Q()
+            for field in SEARCH_FIELDS:
+                term_condition |= Q(**{f'{field}__icontains': term})
+            condition &= term_condition
+        return list(queryset.filter(condition).order_by('-date', '-id')[offset:offset + limit])
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid %% 2 = %s "
+            f"ORDER BY bm25({FTS_TABLE}) LIMIT %s OFFSET %s",
+            [_match_expression(user.pk, query), KINDS[kind], limit, offset],
+        )
+        ids = [rowid // 2 for (rowid,) in cursor.fetchall()]
+
+    objects = queryset.in_bulk(ids)
+    return [objects[pk] for pk in ids if pk in objects]
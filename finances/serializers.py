@@ -2,6 +2,31 @@
 from rest_framework import serializers
 from .models import *
 
+def flat_requested(request):
+    """True when the client asked for ``?expand=none`` (related objects as ids)."""
+    return request is not None and request.query_params.get('expand') == 'none'
+
+
+def is_flat(context):
+    return context.get('flat', False) or flat_requested(context.get('request'))
+
+
+class FlatExpandMixin:
+    """
+    Renders the nested relations listed in ``expandable_fields`` as plain ids
+    when the request has ``?expand=none``, for clients that cache persons and
+    wallets locally.
+    """
+    expandable_fields = ()
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if is_flat(self.context):
+            for name in self.expandable_fields:
+                fields[name] = serializers.PrimaryKeyRelatedField(read_only=True)
+        return fields
+
+
 class PersonSerializer(serializers.ModelSerializer):
     class Meta:
         model = Person
@@ -13,12 +38,25 @@ class CategorySerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Category
-        fields = ['id', 'name', 'parent_id', 'is_income', 'children']
+        fields = ['id', 'name', 'parent_id', 'is_income', 'children', 'updated_at']
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if is_flat(self.context):
+            # Flat mode: a plain row with its parent id instead of a subtree.
+            fields.pop('children')
+            fields['parent'] = serializers.PrimaryKeyRelatedField(read_only=True)
+        return fields
 
     def get_children(self, obj):
-        # Recursively serialize children
-        children = Category.objects.filter(parent=obj)
-        serializer = CategorySerializer(children, many=True)
+        # Recursively serialize children. Views pass a prebuilt parent -> children
+        # map in the context so the whole tree is rendered from a single query.
+        children_map = self.context.get('children_map')
+        if children_map is None:
+            children = Category.objects.filter(parent=obj)
+        else:
+            children = children_map.get(obj.id, [])
+        serializer = CategorySerializer(children, many=True, context=self.context)
         return serializer.data
 
 class TagSerializer(serializers.ModelSerializer):
@@ -38,7 +76,28 @@ class WalletSerializer(serializers.ModelSerializer):
         exclude = ['user']
 
 
-class IncomeSerializer(serializers.ModelSerializer):
+class WalletTransferSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WalletTransfer
+        exclude = ['user']
+        read_only_fields = ['source']
+        extra_kwargs = {'destination': {'required': True, 'allow_null': False}}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is not None and 'destination' in fields:
+            fields['destination'].queryset = Wallet.objects.filter(user=request.user)
+        return fields
+
+    def validate_amount(self, value):
+        if value < 1:
+            raise serializers.ValidationError("Must be at least 1.")
+        return value
+
+
+class IncomeSerializer(FlatExpandMixin, serializers.ModelSerializer):
+    expandable_fields = ('person', 'wallet')
     person = PersonSerializer(read_only=True)
     person_id = serializers.IntegerField(write_only=True, required=False, allow_null=True)
     wallet = WalletSerializer(read_only=True)
@@ -46,8 +105,10 @@ class IncomeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Income
         exclude = ['user']
+        read_only_fields = ['recurring']
 
-class ExpenseSerializer(serializers.ModelSerializer):
+class ExpenseSerializer(FlatExpandMixin, serializers.ModelSerializer):
+    expandable_fields = ('person', 'wallet')
     person = PersonSerializer(read_only=True)
     person_id = serializers.IntegerField(write_only=True, required=False, allow_null=True)
     wallet = WalletSerializer(read_only=True)
@@ -55,22 +116,102 @@ class ExpenseSerializer(serializers.ModelSerializer):
     class Meta:
         model = Expense
         exclude = ['user']
+        read_only_fields = ['recurring']
 
-class DebtSerializer(serializers.ModelSerializer):
+class DebtSerializer(FlatExpandMixin, serializers.ModelSerializer):
+    expandable_fields = ('person',)
     person = PersonSerializer(read_only=True)
     person_id = serializers.IntegerField(write_only=True)
     class Meta:
         model = Debt
         exclude = ['user']
 
-class CreditSerializer(serializers.ModelSerializer):
+class CreditSerializer(FlatExpandMixin, serializers.ModelSerializer):
+    expandable_fields = ('person',)
     person = PersonSerializer(read_only=True)
     person_id = serializers.IntegerField(write_only=True)
     class Meta:
         model = Credit
         exclude = ['user']
 
+class InstallmentDetailSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = InstallmentDetail
+        fields = ['id', 'inst_num', 'payment_status', 'payment_date', 'amount']
+
+
 class InstallmentSerializer(serializers.ModelSerializer):
+    details = InstallmentDetailSerializer(many=True, read_only=True)
+
     class Meta:
         model = Installment
         exclude = ['user']
+
+    def validate_inst_num(self, value):
+        if value < 1:
+            raise serializers.ValidationError("Must be at least 1.")
+        return value
+
+    def validate_pay_period(self, value):
+        if value < 1:
+            raise serializers.ValidationError("Must be at least 1.")
+        return value
+
+    def validate_inst_rate(self, value):
+        if value is not None and value < 0:
+            raise serializers.ValidationError("Must be at least 0.")
+        return value
+
+
+class UpcomingInstallmentSerializer(serializers.ModelSerializer):
+    installment_id = serializers.IntegerField(read_only=True)
+    text = serializers.CharField(source='installment.text', read_only=True)
+
+    class Meta:
+        model = InstallmentDetail
+        fields = ['id', 'installment_id', 'text', 'inst_num', 'payment_date', 'amount']
+
+
+class RecurringTransactionSerializer(serializers.ModelSerializer):
+    schedule_fields = ('start_date', 'interval', 'interval_count')
+
+    class Meta:
+        model = RecurringTransaction
+        exclude = ['user']
+        read_only_fields = ['occurrences', 'next_run']
+
+    owned_fields = {'wallet': Wallet, 'person': Person, 'tag': Tag, 'category': Category}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is not None:
+            # Rules may only point at the user's own objects.
+            for name, model in self.owned_fields.items():
+                fields[name].queryset = model.objects.filter(user=request.user)
+        return fields
+
+    def validate_amount(self, value):
+        if value < 1:
+            raise serializers.ValidationError("Must be at least 1.")
+        return value
+
+    def validate_interval_count(self, value):
+        if value < 1:
+            raise serializers.ValidationError("Must be at least 1.")
+        return value
+
+    def validate(self, attrs):
+        # Materialized occurrences are numbered against the schedule, so it is
+        # fixed once the rule exists.
+        if self.instance is not None:
+            for field in self.schedule_fields:
+                if field in attrs and attrs[field] != getattr(self.instance, field):
+                    raise serializers.ValidationError(
+                        {field: "The schedule of an existing rule cannot be changed; create a new rule instead."}
+                    )
+        start_date = attrs.get('start_date', getattr(self.instance, 'start_date', None))
+        end_date = attrs.get('end_date', getattr(self.instance, 'end_date', None))
+        if start_date and end_date and end_date < start_date:
+            raise serializers.ValidationError({'end_date': "Must not be before start_date."})
+        return attrs
@@ -0,0 +1,125 @@
+# finances/services.py
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .jalali import jalali_month
+from .models import Wallet, WalletTransaction, WalletTransfer, MonthlyRollup
+
+
+def apply_wallet_delta(wallet, amount, source, source_id=None, require_funds=False):
+    """
+    Add ``amount`` (signed) to the wallet balance and append it to the ledger.
+
+    The balance is changed with a single ``UPDATE ... SET balance = balance + x``
+    so concurrent requests never overwrite each other. With ``require_funds``
+    the update only matches while the balance still covers a withdrawal, which
+    makes the sufficiency check and the write one atomic statement.
+    """
+    if not amount:
+        return
+    with transaction.atomic():
+        wallets = Wallet.objects.filter(pk=wallet.pk)
+        if require_funds and amount < 0:
+            wallets = wallets.filter(balance__gte=-amount)
+        if not wallets.update(balance=F('balance') + amount, updated_at=timezone.now()):
+            raise ValidationError(f"Insufficient balance in wallet '{wallet.name}'.")
+        WalletTransaction.objects.create(
+            wallet=wallet, amount=amount, source=source, source_id=source_id
+        )
+
+
+def apply_wallet_deltas(deltas, source):
+    """
+    Apply a ``{wallet_id: amount}`` map of aggregated changes, one ledger
+    entry per wallet. Used by bulk writers that skip per-row balance updates.
+    """
+    for wallet in Wallet.objects.filter(pk__in=[pk for pk, amount in deltas.items() if amount]):
+        apply_wallet_delta(wallet, deltas[wallet.pk], source)
+
+
+def transfer_funds(user, source, destination, amount, text='', date=None):
+    """
+    Move ``amount`` from ``source`` to ``destination`` in one transaction.
+
+    Both wallet rows are locked in primary-key order, so two opposite
+    transfers between the same wallets cannot deadlock, and the withdrawal
+    goes through the same guarded update as expenses.
+    """
+    with transaction.atomic():
+        list(Wallet.objects.select_for_update().filter(pk__in=[source.pk, destination.pk]).order_by('pk'))
+        transfer = WalletTransfer.objects.create(
+            user=user, source=source, destination=destination, amount=amount, text=text,
+            date=date or timezone.now(),
+        )
+        apply_wallet_delta(source, -amount, 'transfer', transfer.pk, require_funds=True)
+        apply_wallet_delta(destination, amount, 'transfer', transfer.pk)
+    return transfer
+
+
+class RollupDeltas(defaultdict):
+    """
+    Accumulates changes to MonthlyRollup rows, keyed by
+    ``(user_id, kind, year, month, category_id, wallet_id)``, so a batch of
+    writes touches each rollup row once.
+    """
+
+    def __init__(self):
+        super().__init__(lambda: [0, 0])
+
+    @staticmethod
+    def key_for(kind, obj):
+        if obj.jalali_year is None:
+            # Rows saved before the Jalali columns existed.
+            year, month = jalali_month(obj.date)
+        else:
+            year, month = obj.jalali_year, obj.jalali_month
+        return (obj.user_id, kind, year, month, obj.category_id, obj.wallet_id)
+
+    def add(self, kind, obj, sign=1):
+        self.add_key(self.key_for(kind, obj), obj.amount, sign)
+
+    def add_key(self, key, amount, sign=1):
+        delta = self[key]
+        delta[0] += sign * amount
+        delta[1] += sign
+
+
+def apply_rollup_deltas(deltas):
+    """Fold accumulated RollupDeltas into the MonthlyRollup table."""
+    with transaction.atomic():
+        for (user_id, kind, year, month, category_id, wallet_id), (total, count) in deltas.items():
+            if not total and not count:
+                continue
+            rollup, _ = MonthlyRollup.objects.get_or_create(
+                user_id=user_id, kind=kind, year=year, month=month,
+                category_id=category_id, wallet_id=wallet_id,
+            )
+            MonthlyRollup.objects.filter(pk=rollup.pk).update(
+                total=F('total') + total, count=F('count') + count
+            )
+            # Drop buckets emptied by deletes or moves to another month/category.
+            MonthlyRollup.objects.filter(pk=rollup.pk, count=0, total=0).delete()
+
+
+def merge_rollups_into_unassigned(field, pk):
+    """
+    Fold the MonthlyRollup rows of a category or wallet (``field``) that is
+    being deleted into the matching rows without one. Deleting it nulls the
+    ``field`` of its incomes/expenses, so later edits of those rows adjust
+    the unassigned buckets, which must already hold their amounts.
+    """
+    deltas = RollupDeltas()
+    with transaction.atomic():
+        rows = MonthlyRollup.objects.select_for_update().filter(**{field: pk})
+        for row in rows:
+            category_id = None if field == 'category' else row.category_id
+            wallet_id = None if field == 'wallet' else row.wallet_id
+            delta = deltas[(row.user_id, row.kind, row.year, row.month, category_id, wallet_id)]
+            delta[0] += row.total
+            delta[1] += row.count
+        rows.delete()
+        apply_rollup_deltas(deltas)
@@ -0,0 +1,108 @@
+# finances/signals.py
+from django.contrib.auth import get_user_model
+from django.db.models import SET_NULL
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Income, Expense, Person, Tag, Category, Wallet, Tombstone
+from .search import index_rows, remove_rows
+from .receipts import is_processed, schedule_processing
+from .services import merge_rollups_into_unassigned
+from .sync import RESOURCE_NAMES
+
+TRANSACTION_MODELS = {Income: 'income', Expense: 'expense'}
+
+
+@receiver(post_save, sender=Income)
+@receiver(post_save, sender=Expense)
+def index_transaction(sender, instance, **kwargs):
+    index_rows(TRANSACTION_MODELS[sender], sender, [instance.pk])
+
+
+@receiver(post_save, sender=Expense)
+def process_receipt_upload(sender, instance, **kwargs):
+    if instance.receipt_image and not is_processed(instance.receipt_image.name):
+        schedule_processing(instance.pk)
+    elif not instance.receipt_image and (instance.receipt_thumbnail or instance.receipt_preview):
+        # Receipt removed: drop the generated images with it.
+        Expense.objects.filter(pk=instance.pk).update(
+            receipt_thumbnail=None, receipt_preview=None, updated_at=timezone.now()
+        )
+
+
+@receiver(post_delete, sender=Income)
+@receiver(post_delete, sender=Expense)
+def unindex_transaction(sender, instance, **kwargs):
+    remove_rows(TRANSACTION_MODELS[sender], [instance.pk])
+
+
+def _related_ids(field, instance):
+    return {
+        model: list(model.objects.filter(**{field: instance}).values_list('pk', flat=True))
+        for model in TRANSACTION_MODELS
+    }
+
+
+def _reindex(related_ids):
+    for model, ids in related_ids.items():
+        index_rows(TRANSACTION_MODELS[model], model, ids)
+
+
+@receiver(post_save, sender=Person)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Category)
+def reindex_renamed(sender, instance, created, **kwargs):
+    # A renamed person/tag/category changes the indexed text of its rows.
+    if not created:
+        _reindex(_related_ids(sender.__name__.lower(), instance))
+
+
+@receiver(pre_delete, sender=Person)
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Category)
+def collect_rows_to_reindex(sender, instance, **kwargs):
+    instance._search_related_ids = _related_ids(sender.__name__.lower(), instance)
+
+
+@receiver(post_delete, sender=Person)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Category)
+def reindex_detached(sender, instance, **kwargs):
+    _reindex(getattr(instance, '_search_related_ids', {}))
+
+
+@receiver(pre_delete, sender=Category)
+@receiver(pre_delete, sender=Wallet)
+def merge_detached_rollups(sender, instance, origin=None, **kwargs):
+    # Runs inside the delete's transaction, before the rows' ids are nulled.
+    if isinstance(origin, get_user_model()):
+        return
+    merge_rollups_into_unassigned(sender.__name__.lower(), instance.pk)
+
+
+def record_tombstone(sender, instance, origin=None, **kwargs):
+    # Rows removed because their user is being deleted need no tombstone
+    # (and one would reference the user row being removed).
+    if isinstance(origin, get_user_model()):
+        return
+    Tombstone.objects.create(user_id=instance.user_id, resource=RESOURCE_NAMES[sender], object_id=instance.pk)
+
+
+def touch_detached_rows(sender, instance, origin=None, **kwargs):
+    # Deleting a row nulls the foreign keys of synced rows pointing at it
+    # with a queryset UPDATE that leaves updated_at alone; stamp those rows
+    # first so the next delta sync sends them with the cleared id.
+    user_model = get_user_model()
+    if sender is not user_model and isinstance(origin, user_model):
+        return
+    now = timezone.now()
+    for relation in sender._meta.related_objects:
+        if relation.on_delete is SET_NULL and relation.related_model in RESOURCE_NAMES:
+            relation.related_model.objects.filter(**{relation.field.name: instance}).update(updated_at=now)
+
+
+for synced_model in RESOURCE_NAMES:
+    post_delete.connect(record_tombstone, sender=synced_model, dispatch_uid=f'tombstone-{synced_model.__name__}')
+    pre_delete.connect(touch_detached_rows, sender=synced_model, dispatch_uid=f'touch-{synced_model.__name__}')
+pre_delete.connect(touch_detached_rows, sender=get_user_model(), dispatch_uid='touch-user')
@@ -0,0 +1,82 @@
+# finances/sync.py
+from datetime import timedelta
+
+from django.core import signing
+from django.utils import timezone
+
+from .models import (
+    Person, Category, Tag, Budget, Wallet, WalletTransfer, Income, Expense,
+    RecurringTransaction, Debt, Credit, Installment, Tombstone,
+)
+from .serializers import (
+    PersonSerializer, CategorySerializer, TagSerializer, BudgetSerializer, WalletSerializer, WalletTransferSerializer,
+    IncomeSerializer, ExpenseSerializer, RecurringTransactionSerializer, DebtSerializer,
+    CreditSerializer, InstallmentSerializer,
+)
+
+SYNC_RESOURCES = {
+    'persons': (Person, PersonSerializer),
+    'categories': (Category, CategorySerializer),
+    'tags': (Tag, TagSerializer),
+    'budgets': (Budget, BudgetSerializer),
+    'wallets': (Wallet, WalletSerializer),
+    'transfers': (WalletTransfer, WalletTransferSerializer),
+    'incomes': (Income, IncomeSerializer),
+    'expenses': (Expense, ExpenseSerializer),
+    'recurring': (RecurringTransaction, RecurringTransactionSerializer),
+    'debts': (Debt, DebtSerializer),
+    'credits': (Credit, CreditSerializer),
+    'installments': (Installment, InstallmentSerializer),
+}
+RESOURCE_NAMES = {model: name for name, (model, serializer_class) in SYNC_RESOURCES.items()}
+
+# Rows committed slightly after their updated_at was stamped must not be
+# missed, so each delta re-sends this much history before the token.
+SYNC_OVERLAP = timedelta(minutes=1)
+# Tombstones older than this are pruned; older tokens get a full resync.
+TOMBSTONE_RETENTION = timedelta(days=90)
+TOKEN_SALT = 'finances.sync'
+
+
+def make_token(moment):
+    return signing.dumps(moment.timestamp(), salt=TOKEN_SALT)
+
+
+def read_token(token):
+    """Return the datetime encoded in a sync token; raises signing.BadSignature."""
+    return timezone.datetime.fromtimestamp(signing.loads(token, salt=TOKEN_SALT), tz=timezone.utc)
+
+
+def build_changes(request, since=None):
+    """
+    Return the finance rows of the user changed since ``since`` (all rows
+    when None) in flat form, plus the ids deleted since then, and the token
+    for the next call.
+    """
+    now = timezone.now()
+    user = request.user
+    if since is not None and since < now - TOMBSTONE_RETENTION:
+        since = None
+
+    context = {'request': request, 'flat': True}
+    changes = {}
+    for name, (model, serializer_class) in SYNC_RESOURCES.items():
+        queryset = model.objects.filter(user=user)
+        if since is not None:
+            queryset = queryset.filter(updated_at__gte=since - SYNC_OVERLAP)
+        if model is Installment:
+            queryset = queryset.prefetch_related('details')
+        changes[name] = serializer_class(queryset.order_by('pk'), many=True, context=context).data
+
+    deleted = {name: [] for name in SYNC_RESOURCES}
+    if since is not None:
+        tombstones = Tombstone.objects.filter(user=user, deleted_at__gte=since - SYNC_OVERLAP)
+        for resource, object_id in tombstones.values_list('resource', 'object_id'):
+            deleted[resource].append(object_id)
+
+    return {
+        'token': make_token(now),
+        'full': since is None,
+        'changes': changes,
+        'deleted': deleted,
+    }
@@ -0,0 +1,339 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from .models import (
+    Category, Credit, Debt, Expense, Installment, InstallmentDetail, MonthlyRollup, RecurringTransaction, Tag,
+    Tombstone, Wallet, WalletTransaction, WalletTransfer,
+)
+from .recurring import materialize_due
+from .serializers import ExpenseSerializer
+from .services import apply_wallet_delta, transfer_funds
+from .dashboard import build_dashboard
+from .sync import make_token
+from .views import ExpenseViewSet
+
+User = get_user_model()
+
+
+class WalletDeltaTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', email='owner@example.com', password='pass')
+        self.wallet = Wallet.objects.create(user=self.user, name='cash', balance=100)
+
+    def test_guarded_debit_within_balance(self):
+        apply_wallet_delta(self.wallet, -100, 'expense', 1, require_funds=True)
+
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, 0)
+        self.assertEqual(list(WalletTransaction.objects.values_list('amount', 'source')), [(-100, 'expense')])
+
+    def test_guarded_debit_beyond_balance_is_rejected(self):
+        with self.assertRaises(ValidationError):
+            apply_wallet_delta(self.wallet, -101, 'expense', 1, require_funds=True)
+
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, 100)
+        self.assertFalse(WalletTransaction.objects.exists())
+
+    def test_unguarded_debit_may_overdraw(self):
+        apply_wallet_delta(self.wallet, -150, 'expense', 1)
+
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, -50)
+
+
+
+class ConcurrentTransactionWriteTests(TestCase):
+    """
+    The second of two requests from different devices runs with the row its
+    get_object() loaded before the first one committed.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', email='owner@example.com', password='pass')
+        self.wallet = Wallet.objects.create(user=self.user, name='cash', balance=1000)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        response = self.client.post(
+            '/api/v1/expenses/',
+            {'amount': 100, 'text': 'lunch', 'date': '2025-01-10T10:00:00Z', 'wallet_id': self.wallet.pk}, format='json',
+        )
+        self.stale = Expense.objects.get(pk=response.data['id'])
+        self.view = ExpenseViewSet()
+
+    def balance(self):
+        self.wallet.refresh_from_db()
+        return self.wallet.balance
+
+    def test_update_applies_delta_from_committed_row(self):
+        self.client.patch(f'/api/v1/expenses/{self.stale.pk}/', {'amount': 70}, format='json')
+        self.assertEqual(self.balance(), 930)
+
+        serializer = ExpenseSerializer(self.stale, data={'amount': 50}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        self.view.perform_update(serializer)
+
+        self.assertEqual(self.balance(), 950)
+
+    def test_second_delete_does_not_refund_again(self):
+        self.client.delete(f'/api/v1/expenses/{self.stale.pk}/')
+        self.assertEqual(self.balance(), 1000)
+
+        self.view.perform_destroy(self.stale)
+
+        self.assertEqual(self.balance(), 1000)
+        self.assertEqual(WalletTransaction.objects.filter(wallet=self.wallet).count(), 2)
+
+class TransferTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', email='owner@example.com', password='pass')
+        self.cash = Wallet.objects.create(user=self.user, name='cash', balance=100)
+        self.savings = Wallet.objects.create(user=self.user, name='savings', balance=0)
+
+    def test_transfer_moves_funds(self):
+        transfer = transfer_funds(self.user, self.cash, self.savings, 60)
+
+        self.cash.refresh_from_db()
+        self.savings.refresh_from_db()
+        self.assertEqual((self.cash.balance, self.savings.balance), (40, 60))
+        self.assertEqual(
+            sorted(WalletTransaction.objects.filter(source_id=transfer.pk).values_list('wallet_id', 'amount')),
+            [(self.cash.pk, -60), (self.savings.pk, 60)],
+        )
+
+    def test_failed_transfer_rolls_back(self):
+        with self.assertRaises(ValidationError):
+            transfer_funds(self.user, self.cash, self.savings, 500)
+
+        self.cash.refresh_from_db()
+        self.savings.refresh_from_db()
+        self.assertEqual((self.cash.balance, self.savings.balance), (100, 0))
+        self.assertFalse(WalletTransfer.objects.exists())
+        self.assertFalse(WalletTransaction.objects.exists())
+
+
+class MaterializeRecurringTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', email='owner@example.com', password='pass')
+        self.wallet = Wallet.objects.create(user=self.user, name='cash', balance=1000)
+        start = timezone.now() - timedelta(days=4, hours=1)
+        self.rule = RecurringTransaction.objects.create(
+            user=self.user, kind='expense', amount=10, text='coffee', wallet=self.wallet,
+            interval='day', start_date=start, next_run=start,
+        )
+
+    def test_rerun_does_not_duplicate(self):
+        self.assertEqual(materialize_due(), 5)
+        self.assertEqual(materialize_due(), 0)
+
+        self.assertEqual(Expense.objects.filter(recurring=self.rule).count(), 5)
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, 950)
+
+    def test_lost_progress_does_not_duplicate(self):
+        materialize_due()
+        # As if the rule's progress had not been saved after its rows were.
+        RecurringTransaction.objects.filter(pk=self.rule.pk).update(occurrences=0, next_run=self.rule.start_date)
+
+        self.assertEqual(materialize_due(), 0)
+        self.assertEqual(Expense.objects.filter(recurring=self.rule).count(), 5)
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, 950)
+
+    def test_foreign_wallet_is_never_touched(self):
+        other = User.objects.create_user(username='other', email='other@example.com', password='pass')
+        foreign = Wallet.objects.create(user=other, name='theirs', balance=1000)
+        RecurringTransaction.objects.filter(pk=self.rule.pk).update(wallet=foreign)
+
+        materialize_due()
+
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.balance, 1000)
+        self.assertFalse(Expense.objects.filter(recurring=self.rule).exclude(wallet=None).exists())
+
+
+class MonthlyRollupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', email='owner@example.com', password='pass')
+        self.category = Category.objects.create(user=self.user, name='food')
+        self.wallet = Wallet.objects.create(user=self.user, name='cash', balance=1000)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def snapshot(self):
+        return set(MonthlyRollup.objects.values_list(
+            'user_id', 'year', 'month', 'kind', 'category_id', 'wallet_id', 'total', 'count'
+        ))
+
+    def assert_matches_rebuild(self):
+        incremental = self.snapshot()
+        call_command('rebuild_rollups', stdout=StringIO())
+        self.assertEqual(incremental, self.snapshot())
+
+    def create(self, kind, amount, **fields):
+        response = self.client.post(
+            f'/api/v1/{kind}s/',
+            {'amount': amount, 'text': kind, 'date': '2025-01-10T10:00:00Z', **fields}, format='json',
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data['id']
+
+    def test_edits_after_deleting_category_and_wallet(self):
+        expense = self.create('expense', 100, category=self.category.pk, wallet_id=self.wallet.pk)
+        other = self.create('expense', 40, wallet_id=self.wallet.pk)
+        income = self.create('income', 30, category=self.category.pk, wallet_id=self.wallet.pk)
+
+        self.client.delete(f'/api/v1/categories/{self.category.pk}/')
+        self.assert_matches_rebuild()
+        self.client.patch(f'/api/v1/expenses/{expense}/', {'amount': 50}, format='json')
+        self.assert_matches_rebuild()
+
+        self.client.delete(f'/api/v1/wallets/{self.wallet.pk}/')
+        self.client.delete(f'/api/v1/incomes/{income}/')
+        self.client.patch(f'/api/v1/expenses/{other}/', {'amount': 45}, format='json')
+        self.assert_matches_rebuild()
+        self.assertEqual(
+            {(kind, category, wallet, total) for _, _, _, kind, category, wallet, total, _ in self.snapshot()},
+            {('expense', None, None, 95)},
+        )
+
+
+class SyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', email='owner@example.com', password='pass')
+        self.category = Category.objects.create(user=self.user, name='food')
+        self.tag = Tag.objects.create(user=self.user, name='work')
+        self.expense = Expense.objects.create(
+            user=self.user, amount=100, text='lunch', date=timezone.now(), category=self.category,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def sync(self, since=None):
+        response = self.client.get('/api/v1/sync/', {'since': since} if since else {})
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def ids(self, rows):
+        return [row['id'] for row in rows]
+
+    def test_full_sync_without_token(self):
+        data = self.sync()
+
+        self.assertTrue(data['full'])
+        self.assertTrue(data['token'])
+        self.assertEqual(self.ids(data['changes']['tags']), [self.tag.pk])
+        self.assertEqual(data['changes']['expenses'][0]['category'], self.category.pk)
+
+    def test_delta_sends_changes_and_deletions_since_token(self):
+        # As if everything so far had been synced half an hour ago.
+        earlier = timezone.now() - timedelta(hours=1)
+        for model in (Category, Tag, Expense):
+            model.objects.filter(user=self.user).update(updated_at=earlier)
+        token = make_token(timezone.now() - timedelta(minutes=30))
+
+        new_tag = Tag.objects.create(user=self.user, name='home')
+        category_pk = self.category.pk
+        self.client.delete(f'/api/v1/categories/{category_pk}/')
+        data = self.sync(token)
+
+        self.assertFalse(data['full'])
+        self.assertEqual(self.ids(data['changes']['tags']), [new_tag.pk])
+        self.assertEqual(data['deleted']['categories'], [category_pk])
+        # The expense lost its category through SET_NULL and is sent again.
+        self.assertEqual(self.ids(data['changes']['expenses']), [self.expense.pk])
+        self.assertIsNone(data['changes']['expenses'][0]['category'])
+
+    def test_invalid_token_is_rejected(self):
+        self.assertEqual(self.client.get('/api/v1/sync/', {'since': 'forged'}).status_code, 400)
+
+    def test_deleting_user_leaves_no_tombstones(self):
+        self.user.delete()
+
+        self.assertFalse(Tombstone.objects.exists())
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='owner', email='owner@example.com', password='pass')
+        self.wallet = Wallet.objects.create(user=self.user, name='cash', balance=0)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def revalidate(self, url, etag):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code
+
+    def create_income(self, amount):
+        response = self.client.post(
+            '/api/v1/incomes/',
+            {'amount': amount, 'text': 'salary', 'date': '2025-01-10T10:00:00Z', 'wallet_id': self.wallet.pk}, format='json',
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+
+    def test_unchanged_list_gets_304(self):
+        response = self.client.get('/api/v1/categories/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Last-Modified', response)
+
+        self.assertEqual(self.revalidate('/api/v1/categories/', response['ETag']), 304)
+        # Without Last-Modified, a date alone never validates.
+        self.assertEqual(self.client.get('/api/v1/categories/', HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT').status_code, 200)
+
+    def test_writes_only_invalidate_dependent_resources(self):
+        categories = self.client.get('/api/v1/categories/')['ETag']
+        wallets = self.client.get('/api/v1/wallets/')['ETag']
+        expenses = self.client.get('/api/v1/expenses/')['ETag']
+
+        self.create_income(100)
+
+        self.assertEqual(self.revalidate('/api/v1/categories/', categories), 304)
+        # The wallet balance changed, and expenses embed their wallet.
+        self.assertEqual(self.revalidate('/api/v1/wallets/', wallets), 200)
+        self.assertEqual(self.revalidate('/api/v1/expenses/', expenses), 200)
+
+        incomes = self.client.get('/api/v1/incomes/')['ETag']
+        self.client.post('/api/v1/categories/', {'name': 'salary', 'is_income': True}, format='json')
+        self.assertEqual(self.revalidate('/api/v1/incomes/', incomes), 200)
+
+    def test_every_write_refreshes_the_dashboard(self):
+        self.assertEqual(self.client.get('/api/v1/dashboard/').data['wallets'][0]['balance'], 0)
+
+        self.create_income(100)
+
+        self.assertEqual(self.client.get('/api/v1/dashboard/').data['wallets'][0]['balance'], 100)
+
+
+class DashboardTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', email='owner@example.com', password='pass')
+        now = timezone.now()
+        self.overdue, self.soon, self.later = now - timedelta(days=3), now + timedelta(days=3), now + timedelta(days=60)
+
+    def test_upcoming_includes_overdue_and_skips_later(self):
+        for model in (Debt, Credit):
+            for pay_date in (self.later, self.soon, self.overdue):
+                model.objects.create(user=self.user, amount=10, text='loan', date=self.overdue, pay_date=pay_date)
+        installment = Installment.objects.create(
+            user=self.user, amount=30, text='car', first_date=self.overdue, pay_period=1, inst_num=4,
+        )
+        for inst_num, (status, payment_date) in enumerate(
+            (('paid', self.overdue), ('unpaid', self.overdue), ('unpaid', self.soon), ('unpaid', self.later)), 1,
+        ):
+            InstallmentDetail.objects.create(
+                installment=installment, inst_num=inst_num, payment_status=status, payment_date=payment_date, amount=10,
+            )
+
+        data = build_dashboard(self.user, 1404, 1)
+
+        for key in ('upcoming_debts', 'upcoming_credits'):
+            self.assertEqual([row['pay_date'] for row in data[key]], [self.overdue, self.soon])
+        self.assertEqual([row['inst_num'] for row in data['upcoming_installments']], [2, 3])
@@ -14,7 +14,12 @@ router.register(r"debts", views.DebtViewSet, basename='debt')
 router.register(r"credits", views.CreditViewSet, basename='credit')
 router.register(r"installments", views.InstallmentViewSet, basename='installment')
 router.register(r"wallets", views.WalletViewSet, basename='wallet')
+router.register(r"recurring", views.RecurringTransactionViewSet, basename='recurring')
 
 urlpatterns = [
+    path("dashboard/", views.DashboardView.as_view(), name="dashboard"),
+    path("forecast/", views.ForecastView.as_view(), name="forecast"),
+    path("sync/", views.SyncView.as_view(), name="sync"),
+    path("transactions/import/", views.TransactionImportView.as_view(), name="transaction-import"),
     path("", include(router.urls)),
 ]
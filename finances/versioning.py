@@ -0,0 +1,192 @@
+# finances/versioning.py
+import hashlib
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from rest_framework.permissions import SAFE_METHODS
+
+from .models import DataVersion
+
+FINANCES = 'finances'
+
+# The bumps made inside record_bumps(), as {(user_id, resource): count}.
+_bump_log = ContextVar('finances_bump_log', default=None)
+
+
+def _log_bumps(user_ids, resource):
+    log = _bump_log.get()
+    if log is not None:
+        for user_id in user_ids:
+            log[(user_id, resource)] += 1
+
+
+def get_version(user_id, resource=FINANCES):
+    version = DataVersion.objects.filter(user_id=user_id, resource=resource).values_list('version', flat=True).first()
+    return version or 0
+
+
+def get_versions(user_id, resources):
+    """Return the versions of ``resources``, in order; 0 before a resource's first write."""
+    versions = dict(
+        DataVersion.objects.filter(user_id=user_id, resource__in=resources).values_list('resource', 'version')
+    )
+    return [versions.get(resource, 0) for resource in resources]
+
+
+def bump_version(user_id, resource=FINANCES, step=1):
+    updated = DataVersion.objects.filter(user_id=user_id, resource=resource).update(
+        version=F('version') + step, updated_at=timezone.now()
+    )
+    if not updated:
+        version, created = DataVersion.objects.get_or_create(user_id=user_id, resource=resource, defaults={'version': step})
+        if not created:
+            DataVersion.objects.filter(pk=version.pk).update(version=F('version') + step, updated_at=timezone.now())
+    _log_bumps([user_id], resource)
+
+
+def bump_versions(user_ids, resource=FINANCES):
+    """Bump the counters of several users, in one UPDATE for the rows that exist."""
+    user_ids = set(user_ids)
+    existing = set(
+        DataVersion.objects.filter(user_id__in=user_ids, resource=resource).values_list('user_id', flat=True)
+    )
+    DataVersion.objects.filter(user_id__in=existing, resource=resource).update(
+        version=F('version') + 1, updated_at=timezone.now()
+    )
+    _log_bumps(existing, resource)
+    for user_id in user_ids - existing:
+        bump_version(user_id, resource)
+
+
+@contextmanager
+def record_bumps():
+    """Collect the bumps made inside the block, for burn_versions()."""
+    log = Counter()
+    token = _bump_log.set(log)
+    try:
+        yield log
+    finally:
+        _bump_log.reset(token)
+
+
+def burn_versions(log):
+    """
+    Move every counter bumped in a transaction that was rolled back past the
+    numbers handed out inside it. Payloads cached and ETags issued under
+    those numbers describe data that was never committed, so the next real
+    write must not reuse them.
+    """
+    for (user_id, resource), count in log.items():
+        bump_version(user_id, resource, step=count + 1)
+
+
+def bump_finance_versions(user_id, *resources):
+    """
+    Bump finance ``resources`` a write outside the finance views changed,
+    together with the app-wide counter that keys the dashboard cache.
+    """
+    for resource in (*resources, FINANCES):
+        bump_version(user_id, resource)
+
+
+class NotModified(Exception):
+    def __init__(self, response):
+        self.response = response
+
+
+class DataVersionMixin:
+    """
+    Bumps a data version after every successful write made through the view
+    and uses it as the validator for conditional GETs: list and retrieve
+    responses carry an ETag, and a matching If-None-Match gets a 304 before
+    any query for the data itself runs.
+
+    Counters are per user and resource. Writes bump ``version_resource``
+    and the resources in ``also_bumps``; the ETag of a read covers
+    ``version_resource`` and the resources in ``depends_on``, whose writes
+    change its payload too.
+
+    A write bumps the counters of every user who sees the written data: only
+    the requesting user, unless the view names the shared object it writes
+    under with ``audience_model`` (its pk is in the ``audience_kwarg`` URL
+    kwarg) and the fields listing its users with ``audience_fields``.
+    """
+    version_resource = FINANCES
+    depends_on = ()
+    also_bumps = ()
+    conditional_actions = ('list', 'retrieve')
+    audience_model = None
+    audience_kwarg = 'pk'
+    audience_fields = ()
+
+    def get_bumped_resources(self):
+        return (self.version_resource, *self.also_bumps)
+
+    def get_version_audience(self):
+        audience = {self.request.user.pk}
+        pk = self.kwargs.get(self.audience_kwarg)
+        if self.audience_model is not None and pk is not None and str(pk).isdigit():
+            for row in self.audience_model.objects.filter(pk=pk).values_list(*self.audience_fields):
+                audience.update(row)
+            audience.discard(None)
+        return audience
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.version_etag = None
+        self.version_audience = set()
+        if request.method not in SAFE_METHODS:
+            # Taken before the write as well, so users the write removes
+            # (a member, a resident) also see their data change.
+            self.version_audience = self.get_version_audience()
+        elif request.method in ('GET', 'HEAD') and getattr(self, 'action', None) in self.conditional_actions:
+            # Read before the data: a write racing this request can only make
+            # the ETag older than the payload, which costs one extra 200.
+            versions = get_versions(request.user.pk, (self.version_resource, *self.depends_on))
+            path = f"{request.get_full_path()}|{request.accepted_renderer.format}"
+            digest = hashlib.sha1(path.encode()).hexdigest()[:16]
+            version = '.'.join(map(str, versions))
+            self.version_etag = f'"{request.user.pk}-{self.version_resource}-{version}-{digest}"'
+            # No Last-Modified: whole-second dates cannot tell apart two
+            # writes in the same second, the version in the ETag can.
+            not_modified = get_conditional_response(request, etag=self.version_etag)
+            if not_modified is not None:
+                raise NotModified(not_modified)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if (
+            request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and request.user.is_authenticated
+        ):
+            audience = getattr(self, 'version_audience', set()) | self.get_version_audience()
+            for resource in dict.fromkeys(self.get_bumped_resources()):
+                bump_versions(audience, resource)
+        elif getattr(self, 'version_etag', None) and response.status_code in (200, 304):
+            response['ETag'] = self.version_etag
+            # Per-user data: never shared by proxies, always revalidated.
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ('Accept', 'Authorization'))
+        return response
+
+
+class FinanceVersionMixin(DataVersionMixin):
+    """
+    Versions the user's finance data. Each endpoint validates conditional
+    GETs against its own resource's counter, so an income write does not
+    invalidate the categories list; every write also bumps the app-wide
+    counter that keys cached reads such as the dashboard and forecast.
+    """
+
+    def get_bumped_resources(self):
+        return (*super().get_bumped_resources(), FINANCES)
@@ -1,5 +1,18 @@
 # finances/views.py
-from rest_framework import viewsets, permissions
+import csv
+from datetime import timedelta
+
+from django.core import signing
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from .models import (
     Person,
     Category,
@@ -10,9 +23,13 @@ from .models import (
     Debt,
     Credit,
     Installment,
+    InstallmentDetail,
+    RecurringTransaction,
     Wallet,
+    WalletTransaction,
+    WalletTransfer,
 )
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
 from .serializers import (
     PersonSerializer,
     CategorySerializer,
@@ -23,10 +40,28 @@ from .serializers import (
     DebtSerializer,
     CreditSerializer,
     InstallmentSerializer,
+    UpcomingInstallmentSerializer,
+    RecurringTransactionSerializer,
     WalletSerializer,
+    WalletTransferSerializer,
+    flat_requested,
 )
-
-class PersonViewSet(viewsets.ModelViewSet):
+from .pagination import TransactionCursorPagination
+from .categories import build_children_map, descendant_ids
+from .jalali import current_jalali_month, jalali_month_bounds
+from .services import apply_wallet_delta, transfer_funds, RollupDeltas, apply_rollup_deltas
+from .importers import TransactionImporter
+from .exporters import iter_transactions_csv
+from .installments import SCHEDULE_FIELDS, generate_schedule, regenerate_unpaid
+from .versioning import FinanceVersionMixin
+from .dashboard import get_dashboard
+from .forecast import get_forecast
+from .search import search as search_transactions
+from .balances import person_balances, empty_balance
+from .sync import build_changes, read_token
+
+class PersonViewSet(FinanceVersionMixin, viewsets.ModelViewSet):
+    version_resource = 'persons'
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = PersonSerializer
     queryset = None  # ⚠️ این خط رو حتماً بزنید
@@ -37,8 +72,30 @@ class PersonViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
-
-class CategoryViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['get'])
+    def balance(self, request, pk=None):
+        """
+        Net position with one person across debts, credits, incomes and
+        expenses. ``net`` > 0 means the person owes you.
+        """
+        person = self.get_object()
+        balance = person_balances(request.user, [person.pk]).get(person.pk, empty_balance())
+        return Response({'person': person.pk, **balance})
+
+    @action(detail=False, methods=['get'])
+    def balances(self, request):
+        """Net position with every person, largest absolute balance first."""
+        balances = person_balances(request.user)
+        rows = [
+            {'person': person_id, 'name': str(person).strip(), **balances.get(person_id, empty_balance())}
+            for person_id, person in self.get_queryset().in_bulk().items()
+        ]
+        rows.sort(key=lambda row: -abs(row['net']))
+        return Response(rows)
+
+
+class CategoryViewSet(FinanceVersionMixin, viewsets.ModelViewSet):
+    version_resource = 'categories'
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = CategorySerializer
     queryset = None
@@ -50,11 +107,25 @@ class CategoryViewSet(viewsets.ModelViewSet):
             return queryset.filter(parent__isnull=True)
         return queryset
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in ('list', 'retrieve'):
+            context['children_map'] = build_children_map(self.request.user)
+        return context
+
+    def list(self, request, *args, **kwargs):
+        # Top-level categories come straight from the prefetched tree instead of
+        # a second query.
+        context = self.get_serializer_context()
+        serializer = self.get_serializer(context['children_map'].get(None, []), many=True, context=context)
+        return Response(serializer.data)
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(FinanceVersionMixin, viewsets.ModelViewSet):
+    version_resource = 'tags'
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = TagSerializer
     queryset = None
@@ -66,7 +137,9 @@ class TagViewSet(viewsets.ModelViewSet):
         serializer.save(user=self.request.user)
 
 
-class BudgetViewSet(viewsets.ModelViewSet):
+class BudgetViewSet(FinanceVersionMixin, viewsets.ModelViewSet):
+    version_resource = 'budgets'
+    depends_on = ('categories',)
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = BudgetSerializer
     queryset = None
@@ -77,165 +150,430 @@ class BudgetViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    @action(detail=False, methods=['get'])
+    def status(self, request):
+        """
+        Budget vs actual for the current Jalali month: spent so far, what is
+        left, and the month-end total projected from the pace to date.
+        Category budgets include the spending of all sub-categories.
+        """
+        year, month = current_jalali_month()
+        start, end = jalali_month_bounds(year, month)
+
+        # One grouped query gives the month's spending per category.
+        spent_by_category = dict(
+            Expense.objects.filter(user=request.user, date__gte=start, date__lt=end)
+            .values('category_id')
+            .annotate(total=Sum('amount'))
+            .values_list('category_id', 'total')
+        )
+        total_spent = sum(spent_by_category.values())
+        children_map = build_children_map(request.user)
+
+        now = timezone.now()
+        elapsed = (now - start).total_seconds()
+        month_length = (end - start).total_seconds()
+
+        budgets = []
+        for budget in self.get_queryset().select_related('category'):
+            if budget.category_id is None:
+                spent = total_spent
+            else:
+                spent = sum(
+                    spent_by_category.get(category_id, 0)
+                    for category_id in descendant_ids(children_map, budget.category_id)
+                )
+            budgets.append({
+                'id': budget.id,
+                'category': budget.category_id,
+                'category_name': budget.category.name if budget.category else None,
+                'monthly_budget': budget.monthly_budget,
+                'spent': spent,
+                'remaining': budget.monthly_budget - spent,
+                'projected': round(spent * month_length / elapsed) if elapsed else spent,
+            })
+
+        return Response({'year': year, 'month': month, 'budgets': budgets})
+
+
+class WalletTransactionMixin:
+    """
+    Shared write path for incomes and expenses.
+
+    The row, the matching wallet ledger entries and the monthly rollups are
+    written in one DB transaction, so a failed balance check rolls
+    everything back.
+    """
+    balance_sign = 1
+    transaction_kind = None
+
+    def get_wallet(self, wallet_id):
+        if wallet_id is None:
+            return None
+        try:
+            return Wallet.objects.get(pk=wallet_id, user=self.request.user)
+        except Wallet.DoesNotExist:
+            raise ValidationError({'wallet_id': 'Wallet not found.'})
+
+    def apply_to_wallet(self, wallet, amount, instance):
+        # Only spending is checked against the balance; reverting an income
+        # may still take a wallet below zero, as before.
+        amount = self.balance_sign * amount
+        require_funds = self.balance_sign < 0 and amount < 0
+        apply_wallet_delta(wallet, amount, self.transaction_kind, instance.pk, require_funds=require_funds)
 
-class IncomeViewSet(viewsets.ModelViewSet):
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            wallet = self.get_wallet(serializer.validated_data.get('wallet_id'))
+            instance = serializer.save(user=self.request.user)
+            if wallet:
+                self.apply_to_wallet(wallet, instance.amount, instance)
+
+            rollups = RollupDeltas()
+            rollups.add(self.transaction_kind, instance)
+            apply_rollup_deltas(rollups)
+
+    def lock_row(self, instance):
+        """
+        Re-read the row under a lock inside the write's transaction, so two
+        devices editing or deleting it at once compute their balance changes
+        from the committed row rather than the copy get_object() loaded.
+        """
+        return type(instance).objects.select_for_update().filter(pk=instance.pk).first()
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            instance = self.lock_row(serializer.instance)
+            if instance is None:
+                raise NotFound()
+            serializer.instance = instance
+            original_amount = instance.amount
+            original_wallet_id = instance.wallet_id
+            new_wallet_id = serializer.validated_data.get('wallet_id', original_wallet_id)
+            rollups = RollupDeltas()
+            rollups.add(self.transaction_kind, instance, sign=-1)
+
+            original_wallet = instance.wallet
+            new_wallet = original_wallet if new_wallet_id == original_wallet_id else self.get_wallet(new_wallet_id)
+            instance = serializer.save()
+
+            if original_wallet_id == new_wallet_id:
+                if original_wallet:
+                    self.apply_to_wallet(original_wallet, instance.amount - original_amount, instance)
+            else:
+                if original_wallet:
+                    self.apply_to_wallet(original_wallet, -original_amount, instance)
+                if new_wallet:
+                    self.apply_to_wallet(new_wallet, instance.amount, instance)
+
+            rollups.add(self.transaction_kind, instance)
+            apply_rollup_deltas(rollups)
+
+        # Reload so the nested wallet in the response shows the new balance.
+        instance.refresh_from_db()
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance = self.lock_row(instance)
+            # Already deleted by a concurrent request, which did the refund.
+            if instance is None:
+                return
+            wallet = instance.wallet
+            rollups = RollupDeltas()
+            rollups.add(self.transaction_kind, instance, sign=-1)
+            deleted, _ = type(instance).objects.filter(pk=instance.pk).delete()
+            if not deleted:
+                return
+            if wallet:
+                self.apply_to_wallet(wallet, -instance.amount, instance)
+            apply_rollup_deltas(rollups)
+
+
+class TransactionReportMixin:
+    """
+    Read-only report actions shared by incomes and expenses.
+    """
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Ranked full-text search (``?q=``) over the text and the person, tag and
+        category names. Paged with ``?page=`` and ``?page_size=`` (max 100).
+        """
+        try:
+            page = max(int(request.query_params.get('page', 1)), 1)
+            page_size = min(max(int(request.query_params.get('page_size', 20)), 1), 100)
+        except ValueError:
+            raise ValidationError('page and page_size must be integers.')
+
+        rows = search_transactions(
+            self.get_queryset(), self.transaction_kind, request.user,
+            request.query_params.get('q', ''), (page - 1) * page_size, page_size + 1,
+        )
+        serializer = self.get_serializer(rows[:page_size], many=True)
+        return Response({
+            'results': serializer.data,
+            'next_page': page + 1 if len(rows) > page_size else None,
+        })
+
+    @action(detail=False, methods=['get'])
+    def periods(self, request):
+        """
+        Totals per Jalali month (``?group=month``, the default) or week
+        (``?group=week``), optionally limited to one ``?year=``. Runs as a
+        GROUP BY on the stored Jalali columns.
+        """
+        group = request.query_params.get('group', 'month')
+        if group not in ('month', 'week'):
+            raise ValidationError({'group': "Must be 'month' or 'week'."})
+        field = f'jalali_{group}'
+
+        queryset = self.get_queryset()
+        year = request.query_params.get('year')
+        if year:
+            try:
+                queryset = queryset.filter(jalali_year=int(year))
+            except ValueError:
+                raise ValidationError({'year': 'Must be an integer.'})
+
+        rows = (
+            queryset.values('jalali_year', field)
+            .annotate(total=Sum('amount'), count=Count('id'))
+            .order_by('jalali_year', field)
+        )
+        return Response([
+            {'year': row['jalali_year'], group: row[field], 'total': row['total'], 'count': row['count']}
+            for row in rows
+        ])
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream the user's rows as CSV. Optional ``start`` and ``end``
+        (YYYY-MM-DD) limit the date range.
+        """
+        queryset = self.get_queryset()
+        start = parse_date(request.query_params.get('start', ''))
+        end = parse_date(request.query_params.get('end', ''))
+        if start:
+            queryset = queryset.filter(date__date__gte=start)
+        if end:
+            queryset = queryset.filter(date__date__lte=end)
+
+        response = StreamingHttpResponse(
+            iter_transactions_csv(queryset, self.transaction_kind),
+            content_type='text/csv; charset=utf-8',
+        )
+        response['Content-Disposition'] = f'attachment; filename="{self.transaction_kind}s.csv"'
+        return response
+
+
+class IncomeViewSet(FinanceVersionMixin, WalletTransactionMixin, TransactionReportMixin, viewsets.ModelViewSet):
+    version_resource = 'incomes'
+    depends_on = ('persons', 'wallets', 'categories', 'tags', 'recurring')
+    # Nested wallets show the balance the write changed.
+    also_bumps = ('wallets',)
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = IncomeSerializer
+    pagination_class = TransactionCursorPagination
     queryset = None
+    transaction_kind = 'income'
 
     def get_queryset(self):
-        return Income.objects.filter(user=self.request.user)
-
-    def perform_create(self, serializer):
-        wallet = serializer.validated_data.get('wallet')
-        amount = serializer.validated_data.get('amount')
+        queryset = Income.objects.filter(user=self.request.user)
+        if flat_requested(self.request):
+            return queryset
+        return queryset.select_related('person', 'wallet')
 
-        if wallet:
-            wallet.balance += amount
-            wallet.save()
 
-        serializer.save(user=self.request.user)
+class ExpenseViewSet(FinanceVersionMixin, WalletTransactionMixin, TransactionReportMixin, viewsets.ModelViewSet):
+    version_resource = 'expenses'
+    depends_on = ('persons', 'wallets', 'categories', 'tags', 'recurring')
+    also_bumps = ('wallets',)
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = ExpenseSerializer
+    pagination_class = TransactionCursorPagination
+    queryset = None
+    balance_sign = -1
+    transaction_kind = 'expense'
 
-    def perform_update(self, serializer):
-        instance = serializer.instance
-        original_amount = instance.amount
-        original_wallet = instance.wallet
-
-        new_wallet = serializer.validated_data.get('wallet', original_wallet)
-        new_amount = serializer.validated_data.get('amount', original_amount)
-
-        if original_wallet == new_wallet:
-            if original_wallet:
-                balance_change = new_amount - original_amount
-                original_wallet.balance += balance_change
-                original_wallet.save()
-        else:
-            if original_wallet:
-                original_wallet.balance -= original_amount
-                original_wallet.save()
-            if new_wallet:
-                new_wallet.balance += new_amount
-                new_wallet.save()
-
-        serializer.save()
+    def get_queryset(self):
+        queryset = Expense.objects.filter(user=self.request.user)
+        if flat_requested(self.request):
+            return queryset
+        return queryset.select_related('person', 'wallet')
+
+
+class TransactionImportView(FinanceVersionMixin, APIView):
+    """
+    Bulk-import incomes and expenses from an uploaded CSV file (field ``file``).
+    Returns the number of created rows and a per-row error report.
+    """
+    version_resource = 'incomes'
+    also_bumps = ('expenses', 'wallets')
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser]
 
-    def perform_destroy(self, instance):
-        if instance.wallet:
-            instance.wallet.balance -= instance.amount
-            instance.wallet.save()
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'A CSV file is required in the "file" field.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        instance.delete()
+        try:
+            report = TransactionImporter(request.user).run(upload.file)
+        except (UnicodeDecodeError, csv.Error):
+            return Response({'error': 'The file is not a valid UTF-8 CSV file.'}, status=status.HTTP_400_BAD_REQUEST)
 
+        created = report['created']['income'] + report['created']['expense']
+        return Response(report, status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST)
 
-from rest_framework.exceptions import ValidationError
 
-class ExpenseViewSet(viewsets.ModelViewSet):
+class DashboardView(APIView):
+    """
+    Everything the home screen needs in one payload: wallet balances, this
+    Jalali month's totals by category, and upcoming debts, credits and
+    installment payments. Cached per user until their finance data changes.
+    """
     permission_classes = [permissions.IsAuthenticated]
-    serializer_class = ExpenseSerializer
-    queryset = None
 
-    def get_queryset(self):
-        return Expense.objects.filter(user=self.request.user)
+    def get(self, request):
+        return Response(get_dashboard(request.user))
 
-    def perform_create(self, serializer):
-        wallet = serializer.validated_data.get('wallet')
-        amount = serializer.validated_data.get('amount')
 
-        if wallet:
-            if wallet.balance < amount:
-                raise ValidationError(f"Insufficient balance in wallet '{wallet.name}'.")
-            wallet.balance -= amount
-            wallet.save()
+class ForecastView(APIView):
+    """
+    Month-end spending projection per category and the days of this Jalali
+    month whose spending in a category is far above the user's usual.
+    """
+    permission_classes = [permissions.IsAuthenticated]
 
-        serializer.save(user=self.request.user)
+    def get(self, request):
+        return Response(get_forecast(request.user))
 
-    def perform_update(self, serializer):
-        instance = serializer.instance
-        original_amount = instance.amount
-        original_wallet = instance.wallet
-
-        # Get the new data from the serializer
-        new_wallet = serializer.validated_data.get('wallet', original_wallet)
-        new_amount = serializer.validated_data.get('amount', original_amount)
-
-        # Case 1: Wallet is unchanged
-        if original_wallet == new_wallet:
-            if original_wallet:
-                # Calculate the difference in amount and adjust the balance
-                balance_change = original_amount - new_amount
-                # Check for sufficient funds if the expense increases
-                if balance_change < 0 and original_wallet.balance < abs(balance_change):
-                     raise ValidationError(f"Insufficient balance in wallet '{original_wallet.name}' to cover the increased expense.")
-                original_wallet.balance += balance_change
-                original_wallet.save()
-        # Case 2: Wallet has changed
-        else:
-            # Step 2.1: Revert the amount from the original wallet
-            if original_wallet:
-                original_wallet.balance += original_amount
-                original_wallet.save()
-            # Step 2.2: Deduct the new amount from the new wallet
-            if new_wallet:
-                if new_wallet.balance < new_amount:
-                    # This check is important. We should revert the change on the original wallet if this fails.
-                    # For simplicity, we raise an error. A more robust solution might use transactions.
-                    if original_wallet:
-                        original_wallet.balance -= original_amount
-                        original_wallet.save()
-                    raise ValidationError(f"Insufficient balance in new wallet '{new_wallet.name}'.")
-                new_wallet.balance -= new_amount
-                new_wallet.save()
-
-        serializer.save()
 
-    def perform_destroy(self, instance):
-        # If the expense had a wallet, add the amount back to its balance
-        if instance.wallet:
-            instance.wallet.balance += instance.amount
-            instance.wallet.save()
+class SyncView(APIView):
+    """
+    Delta sync for offline clients. Without ``?since=`` every finance row of
+    the user is returned; with the token from a previous response only rows
+    changed after it, plus the ids deleted since then. Related objects are
+    sent as ids.
+    """
+    permission_classes = [permissions.IsAuthenticated]
 
-        instance.delete()
+    def get(self, request):
+        since = None
+        token = request.query_params.get('since')
+        if token:
+            try:
+                since = read_token(token)
+            except signing.BadSignature:
+                raise ValidationError({'since': 'Invalid sync token.'})
+        return Response(build_changes(request, since))
 
 
-class DebtViewSet(viewsets.ModelViewSet):
+class DebtViewSet(FinanceVersionMixin, viewsets.ModelViewSet):
+    version_resource = 'debts'
+    depends_on = ('persons',)
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = DebtSerializer
     queryset = None
 
     def get_queryset(self):
-        return Debt.objects.filter(user=self.request.user)
+        queryset = Debt.objects.filter(user=self.request.user)
+        if flat_requested(self.request):
+            return queryset
+        return queryset.select_related('person')
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
 
-class CreditViewSet(viewsets.ModelViewSet):
+class CreditViewSet(FinanceVersionMixin, viewsets.ModelViewSet):
+    version_resource = 'credits'
+    depends_on = ('persons',)
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = CreditSerializer
     queryset = None
 
     def get_queryset(self):
-        return Credit.objects.filter(user=self.request.user)
+        queryset = Credit.objects.filter(user=self.request.user)
+        if flat_requested(self.request):
+            return queryset
+        return queryset.select_related('person')
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
 
-class InstallmentViewSet(viewsets.ModelViewSet):
+class InstallmentViewSet(FinanceVersionMixin, viewsets.ModelViewSet):
+    version_resource = 'installments'
+    depends_on = ('persons',)
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = InstallmentSerializer
     queryset = None
 
     def get_queryset(self):
-        return Installment.objects.filter(user=self.request.user)
+        return Installment.objects.filter(user=self.request.user).prefetch_related('details')
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        with transaction.atomic():
+            installment = serializer.save(user=self.request.user)
+            generate_schedule(installment)
+
+    def perform_update(self, serializer):
+        changed = any(
+            field in serializer.validated_data
+            and serializer.validated_data[field] != getattr(serializer.instance, field)
+            for field in SCHEDULE_FIELDS
+        )
+        with transaction.atomic():
+            installment = serializer.save()
+            if changed:
+                regenerate_unpaid(installment)
+                # Drop the stale prefetch so the response shows the new schedule.
+                installment._prefetched_objects_cache.pop('details', None)
+
+    @action(detail=False, methods=['get'])
+    def upcoming(self, request):
+        """
+        Unpaid installment payments across all of the user's installments that
+        are overdue or due within ``?days=`` (default 30), soonest first.
+        """
+        try:
+            days = int(request.query_params.get('days', 30))
+        except ValueError:
+            raise ValidationError({'days': 'Must be an integer.'})
+
+        details = (
+            InstallmentDetail.objects.filter(
+                installment__user=request.user,
+                payment_status='unpaid',
+                payment_date__lt=timezone.now() + timedelta(days=days),
+            )
+            .select_related('installment')
+            .order_by('payment_date', 'id')
+        )
+        return Response(UpcomingInstallmentSerializer(details, many=True).data)
+
+
+class RecurringTransactionViewSet(FinanceVersionMixin, viewsets.ModelViewSet):
+    version_resource = 'recurring'
+    depends_on = ('wallets', 'persons', 'tags', 'categories')
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = RecurringTransactionSerializer
+    queryset = None
+
+    def get_queryset(self):
+        return RecurringTransaction.objects.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user, next_run=serializer.validated_data['start_date'])
 
 
 from subscriptions.models import Subscription
 
-class WalletViewSet(viewsets.ModelViewSet):
+class WalletViewSet(FinanceVersionMixin, viewsets.ModelViewSet):
+    version_resource = 'wallets'
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = WalletSerializer
     queryset = None
@@ -259,4 +597,44 @@ class WalletViewSet(viewsets.ModelViewSet):
         except Subscription.DoesNotExist:
             raise PermissionDenied("You do not have an active subscription.")
 
-        serializer.save(user=user)
+        with transaction.atomic():
+            wallet = serializer.save(user=user)
+            if wallet.balance:
+                WalletTransaction.objects.create(wallet=wallet, amount=wallet.balance, source='opening')
+
+    def perform_update(self, serializer):
+        # An edited balance is recorded as an adjustment against the current
+        # snapshot; the other fields are saved without touching the balance
+        # column so concurrent ledger updates are never overwritten.
+        new_balance = serializer.validated_data.pop('balance', None)
+        wallet = serializer.instance
+        with transaction.atomic():
+            if serializer.validated_data:
+                for attr, value in serializer.validated_data.items():
+                    setattr(wallet, attr, value)
+                wallet.save(update_fields=[*serializer.validated_data, 'updated_at'])
+            if new_balance is not None:
+                current = Wallet.objects.select_for_update().values_list('balance', flat=True).get(pk=wallet.pk)
+                apply_wallet_delta(wallet, new_balance - current, 'adjustment')
+        wallet.refresh_from_db(fields=['balance', 'updated_at'])
+
+    @action(detail=True, methods=['post'])
+    def transfer(self, request, pk=None):
+        """Move money from this wallet to another wallet of the user."""
+        source = self.get_object()
+        serializer = WalletTransferSerializer(data=request.data, context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        if data['destination'].pk == source.pk:
+            raise ValidationError({'destination': 'Cannot transfer to the same wallet.'})
+        transfer = transfer_funds(
+            request.user, source, data['destination'], data['amount'], data.get('text', ''), data.get('date')
+        )
+        return Response(WalletTransferSerializer(transfer).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['get'])
+    def transfers(self, request, pk=None):
+        """Transfers into and out of this wallet, newest first."""
+        wallet = self.get_object()
+        queryset = WalletTransfer.objects.filter(Q(source=wallet) | Q(destination=wallet))
+        return Response(WalletTransferSerializer(queryset, many=True).data)
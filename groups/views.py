@@ -9,11 +9,19 @@ from .models import Group, GroupExpense, Split
 from .serializers import GroupSerializer, GroupExpenseSerializer
 from subscriptions.permissions import HasFeaturePermission
 from django.shortcuts import get_object_or_404
+from finances.versioning import DataVersionMixin
 
 User = get_user_model()
 
 
-class GroupViewSet(viewsets.ModelViewSet):
+class GroupVersionMixin(DataVersionMixin):
+    # A write to a group bumps the counters of all its members.
+    version_resource = 'groups'
+    audience_model = Group
+    audience_fields = ('members',)
+
+
+class GroupViewSet(GroupVersionMixin, viewsets.ModelViewSet):
     serializer_class = GroupSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -119,7 +127,8 @@ class GroupViewSet(viewsets.ModelViewSet):
         })
 
 
-class GroupExpenseViewSet(viewsets.ModelViewSet):
+class GroupExpenseViewSet(GroupVersionMixin, viewsets.ModelViewSet):
+    audience_kwarg = 'group_pk'
     serializer_class = GroupExpenseSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -5,6 +5,7 @@ from django.contrib.auth import get_user_model
 from django.db.models import Q
 from .models import Friendship, Message
 from finances.models import Person
+from finances.versioning import bump_finance_versions
 from .serializers import FriendshipSerializer, SimpleUserSerializer, MessageSerializer
 
 User = get_user_model()
@@ -161,6 +162,9 @@ class FriendshipViewSet(viewsets.ViewSet):
             linked_user=to_user,
             defaults={'first_name': to_user.first_name, 'last_name': to_user.last_name, 'relation': 'Friend'}
         )
+        # Both users' persons changed outside the finance views.
+        bump_finance_versions(from_user.pk, 'persons')
+        bump_finance_versions(to_user.pk, 'persons')
 
         serializer = FriendshipSerializer(friend_request)
         return Response(serializer.data)
@@ -190,6 +194,8 @@ class FriendshipViewSet(viewsets.ViewSet):
                 person2.save()
 
             friendship.delete()
+            bump_finance_versions(request.user.pk, 'persons')
+            bump_finance_versions(friend_to_remove.pk, 'persons')
             return Response(status=status.HTTP_204_NO_CONTENT)
         except (User.DoesNotExist, Friendship.DoesNotExist):
             return Response({"error": "Friendship not found."}, status=status.HTTP_404_NOT_FOUND)